@@ -0,0 +1,32 @@
+"""
+Application settings
+Loads .env once; other modules import their settings from here
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Development server: single auto-reloading worker (app/run.py)
+DEV_MODE = os.getenv("SKYVAULT_DEV") == "1"
+
+# API Keys
+ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
+RESEND_API_KEY = os.getenv("RESEND_API_KEY")
+
+# Email Settings
+NOTIFICATION_EMAIL = os.getenv("NOTIFICATION_EMAIL", "andrii@example.com")
+FROM_EMAIL = os.getenv("FROM_EMAIL", "kyc@yourdomain.com")
+
+# Resend allows ~10 requests/second; stay under it so bursts queue instead of failing with 429
+RESEND_RATE_LIMIT = float(os.getenv("RESEND_RATE_LIMIT", "8"))
+if RESEND_RATE_LIMIT <= 0:
+    raise ValueError(f"RESEND_RATE_LIMIT must be positive, got {RESEND_RATE_LIMIT}")
+
+# Write output/email_preview.html from send_kyc_email_test()
+SAVE_EMAIL_PREVIEW = os.getenv("SAVE_EMAIL_PREVIEW", "1") != "0"
+
+# Worker processes for PDF filling; 0 fills in a thread
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "0"))
@@ -3,20 +3,151 @@ Email Notification Module
 Sends KYC extraction results via Resend
 """
 
-import os
-import base64
+import asyncio
+import time
 from pathlib import Path
 from typing import Optional
+import pybase64
 import resend
-from dotenv import load_dotenv
+from jinja2 import Environment
+from markupsafe import Markup
 
-load_dotenv()
+from .config import (
+    FROM_EMAIL,
+    NOTIFICATION_EMAIL,
+    RESEND_API_KEY,
+    RESEND_RATE_LIMIT,
+    SAVE_EMAIL_PREVIEW,
+)
 
 # Initialize Resend
-resend.api_key = os.getenv("RESEND_API_KEY")
+resend.api_key = RESEND_API_KEY
+
+# Sender/recipient fields shared by every notification
+_BASE_PARAMS = {"from": FROM_EMAIL, "to": [NOTIFICATION_EMAIL]}
+
+
+class TokenBucket:
+    """Async token bucket allowing `rate` acquisitions per second, bursting up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        # A bucket that can't hold a whole token would never release one
+        self.capacity = max(1.0, capacity or rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+_send_limiter = TokenBucket(RESEND_RATE_LIMIT)
+
+# How long to hold attachment-free emails so concurrent sends share one batch call
+EMAIL_BATCH_WINDOW = 0.2
+# Resend's per-request limit for batch sends
+EMAIL_BATCH_MAX = 100
 
-NOTIFICATION_EMAIL = os.getenv("NOTIFICATION_EMAIL", "andrii@example.com")
-FROM_EMAIL = os.getenv("FROM_EMAIL", "kyc@yourdomain.com")
+
+class _EmailQueue:
+    """
+    Coalesce emails sent within a short window into one Resend batch call.
+
+    Resend's batch endpoint does not accept attachments, so only
+    attachment-free emails go through here. send() waits for its batch
+    to be delivered and raises if the batch call fails.
+    """
+
+    def __init__(self, window: float = EMAIL_BATCH_WINDOW, max_batch: int = EMAIL_BATCH_MAX):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    async def send(self, params: dict):
+        """Queue an email and wait until its batch has been sent"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((params, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        await future
+
+    def _flush(self):
+        """Hand the pending emails to a send task"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._send_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send_batch(self, batch: list):
+        """Deliver one batch and resolve its waiters"""
+        params = [p for p, _ in batch]
+        try:
+            async with _send_limiter:
+                if len(params) == 1:
+                    await asyncio.to_thread(resend.Emails.send, params[0])
+                else:
+                    await asyncio.to_thread(resend.Batch.send, params)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+
+
+_email_queue = _EmailQueue()
+
+# Read size for attachment encoding - a multiple of 3 so only the last chunk is padded
+B64_CHUNK_SIZE = 48 * 1024
+
+
+def _encode_attachment(path: Path) -> str:
+    """
+    Base64-encode a file chunk by chunk into a preallocated buffer.
+
+    Avoids holding the raw file and a second full-size encoded copy in memory.
+    """
+    encoded = bytearray((path.stat().st_size + 2) // 3 * 4)
+    view = memoryview(encoded)
+    pos = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(B64_CHUNK_SIZE):
+            block = pybase64.b64encode(chunk)
+            view[pos:pos + len(block)] = block
+            pos += len(block)
+    view.release()
+    del encoded[pos:]
+    return encoded.decode("ascii")
 
 
 async def send_kyc_email(
@@ -43,8 +174,7 @@ async def send_kyc_email(
     full_name = f"{client_name.get('first', 'Unknown')} {client_name.get('last', 'Client')}"
 
     # Build email subject
-    has_flags = len(validation_result.get("red_flags", [])) > 0
-    flag_indicator = "⚠️ " if has_flags else "✅ "
+    flag_indicator = "⚠️ " if validation_result.get("red_flags") else "✅ "
     subject = f"{flag_indicator}KYC Extraction Complete: {full_name}"
 
     # Build HTML body
@@ -53,27 +183,23 @@ async def send_kyc_email(
     # Prepare attachments
     attachments = []
     if pdf_path and Path(pdf_path).exists():
-        with open(pdf_path, "rb") as f:
-            pdf_content = base64.b64encode(f.read()).decode()
         attachments.append({
             "filename": Path(pdf_path).name,
-            "content": pdf_content,
+            "content": await asyncio.to_thread(_encode_attachment, Path(pdf_path)),
             "type": "application/pdf"
         })
 
     # Send email
     try:
-        params = {
-            "from": FROM_EMAIL,
-            "to": [NOTIFICATION_EMAIL],
-            "subject": subject,
-            "html": html_body,
-        }
+        params = {**_BASE_PARAMS, "subject": subject, "html": html_body}
 
         if attachments:
             params["attachments"] = attachments
-
-        response = resend.Emails.send(params)
+            # The Resend SDK is synchronous; keep its HTTP round-trip off the event loop
+            async with _send_limiter:
+                await asyncio.to_thread(resend.Emails.send, params)
+        else:
+            await _email_queue.send(params)
         return True
 
     except Exception as e:
@@ -81,193 +207,122 @@ async def send_kyc_email(
         return False
 
 
-def _build_email_html(data: dict, validation: dict, form_type: str) -> str:
-    """Build the HTML email body"""
-
-    client_name = data.get("client_name", {})
-    full_name = f"{client_name.get('first', '')} {client_name.get('last', '')}".strip() or "Unknown"
-
-    address = data.get("address", {})
-    contact = data.get("contact", {})
-    personal = data.get("personal", {})
-    employment = data.get("employment", {})
-    financials = data.get("financials", {})
-    profile = data.get("investment_profile", {})
-    exemption = data.get("exemption_status", {})
-
-    # Format currency values
-    def fmt_currency(val):
-        if val is None:
-            return "N/A"
-        try:
-            return f"${int(val):,}"
-        except (ValueError, TypeError):
-            return str(val)
-
-    # Build red flags section
-    red_flags = validation.get("red_flags", [])
-    red_flags_html = ""
-    if red_flags:
-        flags_list = "".join(f"<li style='color: #dc3545;'>{flag}</li>" for flag in red_flags)
-        red_flags_html = f"""
-        <div style="background: #fff5f5; border-left: 4px solid #dc3545; padding: 15px; margin: 20px 0;">
-            <h3 style="color: #dc3545; margin-top: 0;">⚠️ Red Flags - Action Required</h3>
-            <ul>{flags_list}</ul>
-        </div>
-        """
-
-    # Build warnings section
-    warnings = validation.get("warnings", [])
-    warnings_html = ""
-    if warnings:
-        warnings_list = "".join(f"<li>{w}</li>" for w in warnings)
-        warnings_html = f"""
-        <div style="background: #fff8e6; border-left: 4px solid #ffc107; padding: 15px; margin: 20px 0;">
-            <h3 style="color: #856404; margin-top: 0;">⚡ Warnings</h3>
-            <ul>{warnings_list}</ul>
-        </div>
-        """
-
-    # Build suitability concerns section
-    suitability = validation.get("suitability_concerns", [])
-    suitability_html = ""
-    if suitability:
-        suit_list = "".join(f"<li>{s}</li>" for s in suitability)
-        suitability_html = f"""
-        <div style="background: #e7f3ff; border-left: 4px solid #0066cc; padding: 15px; margin: 20px 0;">
-            <h3 style="color: #0066cc; margin-top: 0;">📋 Suitability Concerns</h3>
-            <ul>{suit_list}</ul>
-        </div>
-        """
-
-    # Build missing fields section
-    missing = validation.get("missing_required", [])
-    missing_html = ""
-    if missing:
-        missing_html = f"""
-        <div style="background: #f8f9fa; border-left: 4px solid #6c757d; padding: 15px; margin: 20px 0;">
-            <h3 style="color: #6c757d; margin-top: 0;">❓ Missing Fields</h3>
-            <p>The following required fields were not found in the transcript:</p>
-            <p><code>{", ".join(missing)}</code></p>
-        </div>
-        """
-
-    # Build follow-up questions section
-    follow_ups = data.get("follow_up_questions", [])
-    follow_up_html = ""
-    if follow_ups:
-        fu_list = "".join(f"<li>{q}</li>" for q in follow_ups)
-        follow_up_html = f"""
-        <div style="background: #f0f7ff; border-left: 4px solid #17a2b8; padding: 15px; margin: 20px 0;">
-            <h3 style="color: #17a2b8; margin-top: 0;">💬 Suggested Follow-up Questions</h3>
-            <ul>{fu_list}</ul>
-        </div>
-        """
-
-    # Exemption badge
-    exemption_status = validation.get("exemption_status", "UNKNOWN")
-    exemption_colors = {
-        "ACCREDITED": ("#28a745", "white"),
-        "ELIGIBLE": ("#17a2b8", "white"),
-        "NON_ELIGIBLE": ("#6c757d", "white"),
-        "UNKNOWN": ("#ffc107", "black")
-    }
-    ex_bg, ex_fg = exemption_colors.get(exemption_status, ("#6c757d", "white"))
-
-    html = f"""
+def _fmt_currency(val) -> str:
+    """Format a dollar amount for display"""
+    if val is None:
+        return "N/A"
+    if isinstance(val, int):
+        return f"${val:,}"
+    # Floats and numeric strings from the model; anything else is shown as-is
+    try:
+        return f"${int(val):,}"
+    except (ValueError, TypeError):
+        return str(val)
+
+
+# Badge colours (background, foreground) per exemption status
+EXEMPTION_COLORS = {
+    "ACCREDITED": ("#28a745", "white"),
+    "ELIGIBLE": ("#17a2b8", "white"),
+    "NON_ELIGIBLE": ("#6c757d", "white"),
+    "UNKNOWN": ("#ffc107", "black")
+}
+
+# Constant document prelude and footer, kept out of the template so each
+# render only produces the per-client body
+_HTML_HEAD = """
     <!DOCTYPE html>
     <html>
     <head>
         <meta charset="UTF-8">
         <style>
-            body {{
+            body {
                 font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Helvetica, Arial, sans-serif;
                 line-height: 1.6;
                 color: #333;
                 max-width: 800px;
                 margin: 0 auto;
                 padding: 20px;
-            }}
-            h1 {{ color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px; }}
-            h2 {{ color: #34495e; margin-top: 30px; }}
-            table {{ width: 100%; border-collapse: collapse; margin: 15px 0; }}
-            th, td {{ padding: 10px; text-align: left; border-bottom: 1px solid #ddd; }}
-            th {{ background: #f8f9fa; font-weight: 600; width: 40%; }}
-            .badge {{
+            }
+            h1 { color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px; }
+            h2 { color: #34495e; margin-top: 30px; }
+            table { width: 100%; border-collapse: collapse; margin: 15px 0; }
+            th, td { padding: 10px; text-align: left; border-bottom: 1px solid #ddd; }
+            th { background: #f8f9fa; font-weight: 600; width: 40%; }
+            .badge {
                 display: inline-block;
                 padding: 5px 15px;
                 border-radius: 20px;
                 font-weight: bold;
                 font-size: 14px;
-            }}
-            .header-section {{
+            }
+            .header-section {
                 display: flex;
                 justify-content: space-between;
                 align-items: center;
                 margin-bottom: 20px;
-            }}
+            }
         </style>
     </head>
-    <body>
+    <body>"""
+
+_EMAIL_TEMPLATE_SRC = """
         <div class="header-section">
             <h1>KYC Extraction Results</h1>
-            <span class="badge" style="background: {ex_bg}; color: {ex_fg};">
-                {exemption_status}
+            <span class="badge" style="background: {{ ex_bg }}; color: {{ ex_fg }};">
+                {{ exemption_status }}
             </span>
         </div>
 
-        <p><strong>Form Type:</strong> {form_type.upper()} KYC</p>
-        <p><strong>Confidence:</strong> Name: {data.get('confidence_scores', {}).get('client_name', 'N/A')} |
-            Financials: {data.get('confidence_scores', {}).get('financials', 'N/A')} |
-            Risk Profile: {data.get('confidence_scores', {}).get('risk_profile', 'N/A')}</p>
+        <p><strong>Form Type:</strong> {{ form_type }} KYC</p>
+        <p><strong>Confidence:</strong> Name: {{ conf_client_name }} |
+            Financials: {{ conf_financials }} |
+            Risk Profile: {{ conf_risk_profile }}</p>
 
-        {red_flags_html}
-        {warnings_html}
-        {suitability_html}
-        {missing_html}
-
-        <h2>👤 Client Information</h2>
-        <table>
-            <tr><th>Full Name</th><td>{full_name}</td></tr>
-            <tr><th>Address</th><td>{address.get('street', 'N/A')}, {address.get('city', 'N/A')}, {address.get('province', 'N/A')} {address.get('postal_code', '')}</td></tr>
-            <tr><th>Phone</th><td>{contact.get('phone', 'N/A')} / {contact.get('cell', 'N/A')}</td></tr>
-            <tr><th>Email</th><td>{contact.get('email', 'N/A')}</td></tr>
-            <tr><th>Date of Birth</th><td>{personal.get('dob', 'N/A')}</td></tr>
-            <tr><th>Occupation</th><td>{employment.get('occupation', 'N/A')}</td></tr>
-            <tr><th>Employer</th><td>{employment.get('employer', 'N/A')}</td></tr>
-        </table>
-
-        <h2>💰 Financial Profile</h2>
-        <table>
-            <tr><th>Annual Income</th><td>{fmt_currency(financials.get('annual_income'))}</td></tr>
-            <tr><th>Spouse Income</th><td>{fmt_currency(financials.get('spouse_income'))}</td></tr>
-            <tr><th>Total Income</th><td>{fmt_currency(financials.get('total_income'))}</td></tr>
-            <tr><th>Net Financial Assets</th><td>{fmt_currency(financials.get('net_financial_assets'))}</td></tr>
-            <tr><th>Non-Financial Assets</th><td>{fmt_currency(financials.get('non_financial_assets'))}</td></tr>
-            <tr><th>Total Assets</th><td>{fmt_currency(financials.get('total_assets'))}</td></tr>
-            <tr><th>Liabilities</th><td>{fmt_currency(financials.get('liabilities'))}</td></tr>
-            <tr><th>Net Worth</th><td><strong>{fmt_currency(financials.get('net_worth'))}</strong></td></tr>
-        </table>
+        {% if red_flags %}
+        <div style="background: #fff5f5; border-left: 4px solid #dc3545; padding: 15px; margin: 20px 0;">
+            <h3 style="color: #dc3545; margin-top: 0;">⚠️ Red Flags - Action Required</h3>
+            <ul>{% for flag in red_flags %}<li style='color: #dc3545;'>{{ flag }}</li>{% endfor %}</ul>
+        </div>
+        {% endif %}
+        {% if warnings %}
+        <div style="background: #fff8e6; border-left: 4px solid #ffc107; padding: 15px; margin: 20px 0;">
+            <h3 style="color: #856404; margin-top: 0;">⚡ Warnings</h3>
+            <ul>{% for w in warnings %}<li>{{ w }}</li>{% endfor %}</ul>
+        </div>
+        {% endif %}
+        {% if suitability %}
+        <div style="background: #e7f3ff; border-left: 4px solid #0066cc; padding: 15px; margin: 20px 0;">
+            <h3 style="color: #0066cc; margin-top: 0;">📋 Suitability Concerns</h3>
+            <ul>{% for s in suitability %}<li>{{ s }}</li>{% endfor %}</ul>
+        </div>
+        {% endif %}
+        {% if missing %}
+        <div style="background: #f8f9fa; border-left: 4px solid #6c757d; padding: 15px; margin: 20px 0;">
+            <h3 style="color: #6c757d; margin-top: 0;">❓ Missing Fields</h3>
+            <p>The following required fields were not found in the transcript:</p>
+            <p><code>{{ missing | join(", ") }}</code></p>
+        </div>
+        {% endif %}
 
-        <h2>📊 Investment Profile</h2>
+        {% for title, rows in tables %}
+        <h2>{{ title }}</h2>
         <table>
-            <tr><th>Knowledge Level</th><td>{profile.get('knowledge_level', 'N/A')}</td></tr>
-            <tr><th>Risk Tolerance</th><td>{profile.get('risk_tolerance', 'N/A')}</td></tr>
-            <tr><th>Risk Capacity</th><td>{profile.get('risk_capacity', 'N/A')}</td></tr>
-            <tr><th>Time Horizon</th><td>{profile.get('time_horizon', 'N/A')} years</td></tr>
-            <tr><th>Investment Objective</th><td>{profile.get('investment_objective', 'N/A')}</td></tr>
+            {% for label, value in rows %}<tr><th>{{ label }}</th><td>{{ value }}</td></tr>
+            {% endfor %}
         </table>
+        {% endfor %}
 
-        <h2>🏦 Exemption Status</h2>
-        <table>
-            <tr><th>Status</th><td><strong>{exemption_status}</strong></td></tr>
-            <tr><th>Is Accredited</th><td>{'Yes' if exemption.get('is_accredited') else 'No'}</td></tr>
-            <tr><th>Is Eligible</th><td>{'Yes' if exemption.get('is_eligible') else 'No'}</td></tr>
-            <tr><th>Reason</th><td>{exemption.get('accreditation_reason', 'N/A')}</td></tr>
-        </table>
+        {% if follow_ups %}
+        <div style="background: #f0f7ff; border-left: 4px solid #17a2b8; padding: 15px; margin: 20px 0;">
+            <h3 style="color: #17a2b8; margin-top: 0;">💬 Suggested Follow-up Questions</h3>
+            <ul>{% for q in follow_ups %}<li>{{ q }}</li>{% endfor %}</ul>
+        </div>
+        {% endif %}
 
-        {follow_up_html}
+"""
 
+_HTML_TAIL = """
         <hr style="margin-top: 40px;">
         <p style="color: #6c757d; font-size: 12px;">
             This extraction was generated automatically by Skyvault KYC.
@@ -276,31 +331,121 @@ def _build_email_html(data: dict, validation: dict, form_type: str) -> str:
         </p>
     </body>
     </html>
-    """
+"""
+
+# Compiled once at import; autoescape keeps transcript-derived values from injecting markup
+_EMAIL_TEMPLATE = Environment(autoescape=True).from_string(_EMAIL_TEMPLATE_SRC)
 
-    return html
+
+def _flatten_ctx(data: dict, validation: dict, form_type: str) -> dict:
+    """Flatten extracted data and validation results into the template context"""
+
+    client_name = data.get("client_name", {})
+    address = data.get("address", {})
+    contact = data.get("contact", {})
+    personal = data.get("personal", {})
+    employment = data.get("employment", {})
+    financials = data.get("financials", {})
+    profile = data.get("investment_profile", {})
+    exemption = data.get("exemption_status", {})
+    confidence = data.get("confidence_scores", {})
+
+    exemption_status = validation.get("exemption_status", "UNKNOWN")
+    ex_bg, ex_fg = EXEMPTION_COLORS.get(exemption_status, ("#6c757d", "white"))
+
+    full_name = f"{client_name.get('first', '')} {client_name.get('last', '')}".strip() or "Unknown"
+
+    # (label, value) rows for each summary table, rendered in order
+    tables = [
+        ("👤 Client Information", [
+            ("Full Name", full_name),
+            ("Address", f"{address.get('street', 'N/A')}, {address.get('city', 'N/A')}, "
+                        f"{address.get('province', 'N/A')} {address.get('postal_code', '')}"),
+            ("Phone", f"{contact.get('phone', 'N/A')} / {contact.get('cell', 'N/A')}"),
+            ("Email", contact.get("email", "N/A")),
+            ("Date of Birth", personal.get("dob", "N/A")),
+            ("Occupation", employment.get("occupation", "N/A")),
+            ("Employer", employment.get("employer", "N/A")),
+        ]),
+        ("💰 Financial Profile", [
+            ("Annual Income", _fmt_currency(financials.get("annual_income"))),
+            ("Spouse Income", _fmt_currency(financials.get("spouse_income"))),
+            ("Total Income", _fmt_currency(financials.get("total_income"))),
+            ("Net Financial Assets", _fmt_currency(financials.get("net_financial_assets"))),
+            ("Non-Financial Assets", _fmt_currency(financials.get("non_financial_assets"))),
+            ("Total Assets", _fmt_currency(financials.get("total_assets"))),
+            ("Liabilities", _fmt_currency(financials.get("liabilities"))),
+            ("Net Worth", _strong(_fmt_currency(financials.get("net_worth")))),
+        ]),
+        ("📊 Investment Profile", [
+            ("Knowledge Level", profile.get("knowledge_level", "N/A")),
+            ("Risk Tolerance", profile.get("risk_tolerance", "N/A")),
+            ("Risk Capacity", profile.get("risk_capacity", "N/A")),
+            ("Time Horizon", f"{profile.get('time_horizon', 'N/A')} years"),
+            ("Investment Objective", profile.get("investment_objective", "N/A")),
+        ]),
+        ("🏦 Exemption Status", [
+            ("Status", _strong(exemption_status)),
+            ("Is Accredited", "Yes" if exemption.get("is_accredited") else "No"),
+            ("Is Eligible", "Yes" if exemption.get("is_eligible") else "No"),
+            ("Reason", exemption.get("accreditation_reason", "N/A")),
+        ]),
+    ]
+
+    return {
+        "full_name": full_name,
+        "form_type": form_type.upper(),
+        "exemption_status": exemption_status,
+        "ex_bg": ex_bg,
+        "ex_fg": ex_fg,
+        "conf_client_name": confidence.get("client_name", "N/A"),
+        "conf_financials": confidence.get("financials", "N/A"),
+        "conf_risk_profile": confidence.get("risk_profile", "N/A"),
+        "red_flags": validation.get("red_flags", []),
+        "warnings": validation.get("warnings", []),
+        "suitability": validation.get("suitability_concerns", []),
+        "missing": validation.get("missing_required", []),
+        "follow_ups": data.get("follow_up_questions", []),
+        "tables": tables,
+    }
+
+
+def _strong(value) -> Markup:
+    """Bold a table value, escaping it first"""
+    return Markup("<strong>{}</strong>").format(value)
+
+
+def _build_email_html(data: dict, validation: dict, form_type: str) -> str:
+    """Build the HTML email body"""
+    return "".join((_HTML_HEAD, _EMAIL_TEMPLATE.render(_flatten_ctx(data, validation, form_type)), _HTML_TAIL))
 
 
 # For testing without Resend
-def send_kyc_email_test(
+EMAIL_PREVIEW_PATH = Path(__file__).parent / "output" / "email_preview.html"
+
+if SAVE_EMAIL_PREVIEW:
+    EMAIL_PREVIEW_PATH.parent.mkdir(exist_ok=True)
+
+
+async def send_kyc_email_test(
     extracted_data: dict,
     validation_result: dict,
     pdf_path: Optional[str] = None,
     form_type: str = "individual"
-) -> str:
-    """
-    Test version that returns HTML instead of sending.
+) -> Optional[str]:
     """
-    html = _build_email_html(extracted_data, validation_result, form_type)
+    Test version that renders the email instead of sending it.
 
-    # Save to file for preview
-    output_path = Path(__file__).parent / "output" / "email_preview.html"
-    output_path.parent.mkdir(exist_ok=True)
+    Writes the HTML to output/email_preview.html and returns that path,
+    or returns None when previews are disabled with SAVE_EMAIL_PREVIEW=0.
+    """
+    if not SAVE_EMAIL_PREVIEW:
+        return None
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(html)
+    html = _build_email_html(extracted_data, validation_result, form_type)
+    await asyncio.to_thread(EMAIL_PREVIEW_PATH.write_text, html, encoding="utf-8")
 
-    return str(output_path)
+    return str(EMAIL_PREVIEW_PATH)
 
 
 # For testing
@@ -363,5 +508,5 @@ if __name__ == "__main__":
         "suitability_concerns": []
     }
 
-    output = send_kyc_email_test(test_data, test_validation, form_type="individual")
+    output = asyncio.run(send_kyc_email_test(test_data, test_validation, form_type="individual"))
     print(f"Email preview saved to: {output}")
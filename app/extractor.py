@@ -4,12 +4,13 @@ Handles multilingual transcripts (Russian, Ukrainian, English)
 """
 
 import json
-import os
+import re
 from typing import Optional
+import httpx
+import orjson
 from anthropic import AsyncAnthropic
-from dotenv import load_dotenv
 
-load_dotenv()
+from .config import ANTHROPIC_API_KEY
 
 # System prompt for KYC extraction
 EXTRACTION_PROMPT = """You are a KYC Data Extraction Agent for Axcess Capital Advisors Inc., a Canadian Exempt Market Dealer. Extract client information from call transcripts and return structured JSON.
@@ -148,11 +149,86 @@ Return ONLY valid JSON (no markdown, no explanation) with this exact structure:
 """
 
 
+# System prompt as a cacheable content block - it is identical on every call,
+# so Anthropic can reuse the processed prefix instead of re-reading it
+EXTRACTION_SYSTEM = [
+    {"type": "text", "text": EXTRACTION_PROMPT, "cache_control": {"type": "ephemeral"}}
+]
+
+
+# Markdown code fence around a JSON reply, e.g. ```json ... ```, possibly followed by prose
+_FENCE_RE = re.compile(r"^```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+# Opening fence only, for replies truncated before the closing fence
+_OPEN_FENCE_RE = re.compile(r"^```(?:json)?\s*(.*?)\s*$", re.DOTALL)
+
+
+def _strip_code_fence(text: str) -> str:
+    """Remove a markdown code fence wrapping the model's JSON reply"""
+    if text.startswith("{"):
+        return text
+    match = _FENCE_RE.match(text) or _OPEN_FENCE_RE.match(text)
+    return match.group(1) if match else text
+
+
+def compact_transcript(transcript: str) -> str:
+    """
+    Strip transcription noise that costs tokens without adding content.
+
+    Collapses runs of whitespace within lines and drops blank lines. Repeated
+    lines are kept: a repeated answer still belongs to its own question.
+    """
+    lines = []
+    for line in transcript.splitlines():
+        line = " ".join(line.split())
+        if line:
+            lines.append(line)
+    return "\n".join(lines)
+
+
+# Client's own introduction on a "Client:" turn ("Client: Hi, my name is John Doe"). Only the
+# phrase ignores case: both names must be capitalised Latin words, so "my name is not important"
+# and "my name is John and ..." fall through, and Cyrillic names are left to Claude to transliterate
+_NAME_RE = re.compile(
+    r"^\s*(?i:client|клиент|клієнт)\s*:[^\n]*?\b(?i:my name is)\s+"
+    r"([A-Z][A-Za-z'\-]+)\s+([A-Z][A-Za-z'\-]+)\b",
+    re.MULTILINE
+)
+NAME_SCAN_CHARS = 500
+
+
+def match_client_name(transcript: str) -> Optional[dict]:
+    """
+    Find the client's self-introduction near the start of the transcript.
+
+    Only client turns are searched, so an advisor introducing themself is
+    never taken for the client. Returns a dict shaped like quick_extract()'s
+    result, or None when no introduction is found.
+    """
+    match = _NAME_RE.search(transcript[:NAME_SCAN_CHARS])
+    if not match:
+        return None
+    return {"first_name": match.group(1), "last_name": match.group(2), "missing_fields": []}
+
+
+# Connection pool for Claude calls, sized so webhook bursts don't queue on the default limits
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+
+
 class KYCExtractor:
     """Extract KYC data from transcripts using Claude"""
 
-    def __init__(self):
-        self.client = AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        """
+        Initialize the extractor.
+
+        Args:
+            http_client: Shared HTTP client for Claude calls (optional);
+                defaults to a keep-alive pool sized by HTTP_LIMITS
+        """
+        self.client = AsyncAnthropic(
+            api_key=ANTHROPIC_API_KEY,
+            http_client=http_client or httpx.AsyncClient(limits=HTTP_LIMITS, follow_redirects=True)
+        )
         self.model = "claude-sonnet-4-20250514"
 
     async def extract(
@@ -180,7 +256,7 @@ Source language hint: {source_language}
 Form type: {form_type}
 
 TRANSCRIPT:
-{transcript}
+{compact_transcript(transcript)}
 
 Remember: Return ONLY valid JSON, no markdown formatting."""
 
@@ -188,25 +264,18 @@ Remember: Return ONLY valid JSON, no markdown formatting."""
         response = await self.client.messages.create(
             model=self.model,
             max_tokens=4000,
-            system=EXTRACTION_PROMPT,
+            system=EXTRACTION_SYSTEM,
             messages=[
                 {"role": "user", "content": user_message}
             ]
         )
 
-        # Parse response
-        response_text = response.content[0].text.strip()
-
-        # Clean up potential markdown formatting
-        if response_text.startswith("```"):
-            response_text = response_text.split("```")[1]
-            if response_text.startswith("json"):
-                response_text = response_text[4:]
-        response_text = response_text.strip()
+        # Parse response, cleaning up potential markdown formatting
+        response_text = _strip_code_fence(response.content[0].text.strip())
 
         try:
-            extracted = json.loads(response_text)
-        except json.JSONDecodeError as e:
+            extracted = orjson.loads(response_text)
+        except orjson.JSONDecodeError as e:
             # Try to salvage partial JSON
             extracted = {
                 "error": "Failed to parse extraction",
@@ -229,23 +298,17 @@ Return ONLY valid JSON."""
 
         response = await self.client.messages.create(
             model=self.model,
-            max_tokens=200,
+            max_tokens=60,  # A name-only reply is ~30 tokens
             messages=[
-                {"role": "user", "content": f"{quick_prompt}\n\nTRANSCRIPT:\n{transcript[:1000]}"}
+                {"role": "user", "content": f"{quick_prompt}\n\nTRANSCRIPT:\n{transcript[:NAME_SCAN_CHARS]}"}
             ]
         )
 
-        response_text = response.content[0].text.strip()
-
-        # Clean markdown if present
-        if response_text.startswith("```"):
-            response_text = response_text.split("```")[1]
-            if response_text.startswith("json"):
-                response_text = response_text[4:]
+        response_text = _strip_code_fence(response.content[0].text.strip())
 
         try:
-            return json.loads(response_text.strip())
-        except json.JSONDecodeError:
+            return orjson.loads(response_text)
+        except orjson.JSONDecodeError:
             return {"first_name": None, "last_name": None, "missing_fields": ["name"]}
 
 
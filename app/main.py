@@ -4,11 +4,16 @@ Main FastAPI application
 """
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Optional
+import asyncio
+import copy
 import logging
 
-from .extractor import KYCExtractor
+from .config import PDF_WORKERS
+from .extractor import KYCExtractor, match_client_name
 from .validator import KYCValidator
 from .pdf_filler import KYCPDFFiller
 from .emailer import send_kyc_email
@@ -20,9 +25,13 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Skyvault KYC Extraction API",
     description="Multilingual AI-powered KYC form filling for Axcess Capital",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+# /extract/sync returns the full extraction (tens of KB); compress anything non-trivial
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 
 class TranscriptRequest(BaseModel):
     """Incoming transcript payload"""
@@ -48,7 +57,7 @@ class ExtractionResponse(BaseModel):
 # Initialize components
 extractor = KYCExtractor()
 validator = KYCValidator()
-pdf_filler = KYCPDFFiller()
+pdf_filler = KYCPDFFiller(processes=PDF_WORKERS)
 
 
 async def process_kyc_background(
@@ -68,23 +77,25 @@ async def process_kyc_background(
             form_type=form_type
         )
 
-        # Step 2: Validate extracted data
-        logger.info("Validating extracted data")
-        validation_result = validator.validate(extracted_data, form_type)
-
-        # Step 3: Generate filled PDF
-        logger.info("Generating PDF")
-        pdf_path = pdf_filler.fill(
-            data=extracted_data,
-            form_type=form_type,
-            dealing_rep=dealing_rep
+        # Steps 2-3: Validate and generate the filled PDF concurrently. The
+        # validator records its findings into the data on another thread, so
+        # the filler (and any worker process it pickles the data for) gets
+        # its own copy, taken before validation starts
+        logger.info("Validating extracted data and generating PDF")
+        validation_result, pdf_path = await asyncio.gather(
+            asyncio.to_thread(validator.validate, extracted_data, form_type),
+            pdf_filler.fill_async(
+                data=copy.deepcopy(extracted_data),
+                form_type=form_type,
+                dealing_rep=dealing_rep
+            )
         )
 
         # Step 4: Send email notification
         logger.info("Sending email notification")
         await send_kyc_email(
             extracted_data=extracted_data,
-            validation_result=validation_result,
+            validation_result=validation_result.to_dict(),
             pdf_path=pdf_path,
             form_type=form_type
         )
@@ -118,13 +129,15 @@ async def receive_transcript(
             detail="Transcript too short or empty"
         )
 
-    # Quick extraction for immediate response
-    try:
-        quick_extract = await extractor.quick_extract(request.transcript)
-        client_name = f"{quick_extract.get('first_name', '')} {quick_extract.get('last_name', '')}".strip()
-    except Exception:
-        client_name = "Unknown"
-        quick_extract = {}
+    # Quick extraction for immediate response - local name match first,
+    # Claude only when the client never introduces themselves
+    quick_extract = match_client_name(request.transcript)
+    if quick_extract is None:
+        try:
+            quick_extract = await extractor.quick_extract(request.transcript)
+        except Exception:
+            quick_extract = {}
+    client_name = f"{quick_extract.get('first_name') or ''} {quick_extract.get('last_name') or ''}".strip()
 
     # Queue full processing in background
     background_tasks.add_task(
@@ -161,16 +174,17 @@ async def extract_sync(request: TranscriptRequest):
         form_type=request.form_type
     )
 
-    # Step 2: Validate
-    validation_result = validator.validate(extracted_data, request.form_type)
+    # Step 2: Validate (off the event loop, like the background pipeline)
+    validation_result = await asyncio.to_thread(validator.validate, extracted_data, request.form_type)
 
     return {
         "status": "success",
         "extracted_data": extracted_data,
-        "validation": validation_result
+        "validation": validation_result.to_dict()
     }
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # The event loop defaults to uvloop wherever it is installed (not on Windows)
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, http="httptools", workers=2)
@@ -3,31 +3,161 @@ PDF Form Filler for KYC Documents
 Fills Axcess Capital KYC forms with extracted data
 """
 
+import asyncio
+import io
 import os
+import sys
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
-from pypdf import PdfReader, PdfWriter
+from typing import TYPE_CHECKING, Optional
+
+# pypdf is imported on first fill rather than at startup - it is the
+# heaviest import in the app and most processes never fill a form
+if TYPE_CHECKING:
+    from pypdf import PdfReader
+
+
+_MODULE_DIR = Path(__file__).resolve().parent
+# PDF templates live in the project root
+DEFAULT_TEMPLATES_DIR = _MODULE_DIR.parent
+# Filled PDFs; created once at import rather than per filler
+OUTPUT_DIR = _MODULE_DIR / "output"
+OUTPUT_DIR.mkdir(exist_ok=True)
+
+# Filled PDFs are roughly the template size plus the field values
+OUTPUT_SIZE_MARGIN = 16 * 1024
+
+# Characters that can't appear in output filenames (path separators and Windows-reserved)
+_FILENAME_TRANS = str.maketrans({
+    " ": "_", "/": "_", "\\": "_", ":": "-",
+    "*": "_", "?": "_", '"': "_", "<": "_", ">": "_", "|": "_",
+})
+
+
+def _interned(table: tuple) -> tuple:
+    """Intern the PDF field names of a field table (first item of each row)"""
+    return tuple((sys.intern(field), *rest) for field, *rest in table)
+
+
+# Individual KYC fields copied from the extracted data:
+# (PDF field, key path into the data, stringify)
+_INDIVIDUAL_FIELDS = _interned((
+    # Section 1 - Client Profile
+    ("Street Address cannot be a PO Box", ("address", "street"), False),
+    ("ApartmentUnit", ("address", "unit"), False),
+    ("City", ("address", "city"), False),
+    ("Prov", ("address", "province"), False),
+    ("Postal Code", ("address", "postal_code"), False),
+    ("Phone day", ("contact", "phone"), False),
+    ("Cell", ("contact", "cell"), False),
+    ("Email", ("contact", "email"), False),
+    ("Date of Birth", ("personal", "dob"), False),
+    ("Dependents", ("personal", "dependents"), True),
+    ("Primary Occupation", ("employment", "occupation"), False),
+    ("Employer", ("employment", "employer"), False),
+
+    # Section 4 - Financial
+    ("Employment Annual Income", ("financials", "annual_income"), True),
+    ("SpousePartner Annual Income", ("financials", "spouse_income"), True),
+    ("Other Income", ("financials", "other_income"), True),
+    ("Total Income", ("financials", "total_income"), True),
+    ("Estimated Net Financial Assets", ("financials", "net_financial_assets"), True),
+    ("Estimated NonFinancial Assets", ("financials", "non_financial_assets"), True),
+    ("Estimated Total Assets", ("financials", "total_assets"), True),
+    ("Estimated Liabilities", ("financials", "liabilities"), True),
+    ("Estimated Net Worth", ("financials", "net_worth"), True),
+
+    # Asset composition (percentages)
+    ("Cash  Deposits", ("asset_composition", "cash_pct"), True),
+    ("Public Equities  Stocks", ("asset_composition", "stocks_pct"), True),
+    ("Fixed Income  Bonds", ("asset_composition", "bonds_pct"), True),
+))
+
+# Individual KYC checkbox groups: key path into the data -> {extracted value: PDF field}.
+# At most one box per group is ticked, found with a single lookup.
+_INDIVIDUAL_CHOICES = tuple(
+    (path, {value: sys.intern(field) for value, field in choices.items()})
+    for path, choices in (
+        # Section 2 - Investment Knowledge
+        (("investment_profile", "knowledge_level"), {
+            "GOOD": "Good", "AVERAGE": "Average", "LIMITED": "Limited",
+        }),
+
+        # Section 3 - Suitability
+        (("investment_profile", "risk_tolerance"), {
+            "LOW": "LOW", "MODERATE": "MODERATE", "HIGH": "HIGH",
+        }),
+        (("investment_profile", "investment_objective"), {
+            "GROWTH": "Growth", "GROWTH_AND_INCOME": "Growth  Income",
+            "INCOME": "Income", "TAX_EFFICIENCY": "Tax Efficiency",
+        }),
+        (("investment_profile", "time_horizon"), {
+            "1-3": "13 years", "3-5": "35 years", "6-10": "610 years", "10+": "10 years",
+        }),
+    )
+)
+
+# Every Individual KYC checkbox unticked, copied into each mapping before ticking
+_INDIVIDUAL_UNCHECKED = {field: False for _, choices in _INDIVIDUAL_CHOICES for field in choices.values()}
+
+
+def _field_pages(reader: "PdfReader") -> dict:
+    """Map each form field name to the indexes of the pages holding its widgets"""
+    field_pages = defaultdict(set)
+    for index, page in enumerate(reader.pages):
+        for annot in page.get("/Annots") or ():
+            # Collect /T from the widget up through its parent fields
+            names = []
+            node = annot.get_object()
+            while node is not None:
+                if "/T" in node:
+                    # Interned so lookups with the (interned) mapping keys compare by identity
+                    names.append(sys.intern(str(node["/T"])))
+                parent = node.get("/Parent")
+                node = parent.get_object() if parent is not None else None
+            if names:
+                field_pages[names[0]].add(index)
+                field_pages[sys.intern(".".join(reversed(names)))].add(index)
+    return dict(field_pages)
+
+
+def _checkbox_state(field, ticked: bool) -> str:
+    """PDF name for a checkbox value: the widget's on-state when ticked, /Off otherwise"""
+    if not ticked:
+        return "/Off"
+    # get_fields() lists a button's appearance states (its /AP /N keys) under /_States_
+    states = field.get("/_States_", ()) if field is not None else ()
+    return next((state for state in states if state != "/Off"), "/Yes")
+
+
+def _lookup(data: dict, path: tuple, default=""):
+    """Follow a key path through nested dicts, treating missing or null sections as empty"""
+    for key in path[:-1]:
+        data = data.get(key) or {}
+    return data.get(path[-1], default)
 
 
 class KYCPDFFiller:
     """Fill KYC PDF forms with extracted data"""
 
-    def __init__(self, templates_dir: Optional[str] = None):
+    # Parsed templates shared by all fillers: resolved path -> (mtime, reader, fields, field pages)
+    _template_cache: dict = {}
+    # Guards cache population and reads from the shared readers' file streams
+    _template_lock = threading.Lock()
+
+    def __init__(self, templates_dir: Optional[str] = None, processes: int = 0):
         """
         Initialize PDF filler.
 
         Args:
             templates_dir: Directory containing PDF templates
+            processes: Worker processes for fill_async (0 fills in a thread instead)
         """
-        if templates_dir:
-            self.templates_dir = Path(templates_dir)
-        else:
-            # Default to parent directory where PDFs are stored
-            self.templates_dir = Path(__file__).parent.parent
-
-        self.output_dir = Path(__file__).parent / "output"
-        self.output_dir.mkdir(exist_ok=True)
+        self.templates_dir = Path(templates_dir) if templates_dir else DEFAULT_TEMPLATES_DIR
+        self.output_dir = OUTPUT_DIR
 
         # Template file mapping
         self.templates = {
@@ -36,6 +166,15 @@ class KYCPDFFiller:
             "trade": "7. Trade Suitability V.6.pdf"
         }
 
+        self.processes = processes
+        self._pool = None  # Created on first process fill
+
+    def __getstate__(self):
+        """Pickle without the process pool (the filler is sent to pool workers)"""
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        return state
+
     def fill(
         self,
         data: dict,
@@ -53,6 +192,47 @@ class KYCPDFFiller:
         Returns:
             Path to the filled PDF file
         """
+        template_path, field_mapping, timestamp = self._prepare(data, form_type, dealing_rep)
+
+        # Fill the PDF
+        output_path = self._fill_pdf(template_path, field_mapping, data, form_type, timestamp)
+
+        return str(output_path)
+
+    async def fill_async(
+        self,
+        data: dict,
+        form_type: str = "individual",
+        dealing_rep: str = "Andrii Andriushchenko"
+    ) -> str:
+        """
+        Fill a PDF form without blocking the event loop.
+
+        Runs in a worker thread, or in a worker process when the filler
+        was created with processes > 0 - pypdf's serialization is pure
+        Python, so processes let concurrent fills use more than one core.
+        Same arguments and return value as fill().
+        """
+        if not self.processes:
+            return await asyncio.to_thread(self.fill, data=data, form_type=form_type, dealing_rep=dealing_rep)
+
+        template_path, field_mapping, timestamp = self._prepare(data, form_type, dealing_rep)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes)
+
+        # Each worker process parses and caches the templates itself
+        output_path = await asyncio.get_running_loop().run_in_executor(
+            self._pool, self._fill_pdf, template_path, field_mapping, data, form_type, timestamp
+        )
+        return str(output_path)
+
+    def _prepare(self, data: dict, form_type: str, dealing_rep: str) -> tuple:
+        """
+        Resolve the template and map extracted data to its fields.
+
+        Returns:
+            Tuple of (template path, field mapping, filename timestamp)
+        """
         template_name = self.templates.get(form_type)
         if not template_name:
             raise ValueError(f"Unknown form type: {form_type}")
@@ -61,116 +241,69 @@ class KYCPDFFiller:
         if not template_path.exists():
             raise FileNotFoundError(f"Template not found: {template_path}")
 
+        # One clock read so the form's Date field and the filename agree
+        now = datetime.now()
+        date_str = now.strftime("%Y-%m-%d")
+
         # Map data to PDF fields based on form type
         if form_type == "individual":
-            field_mapping = self._map_individual_fields(data, dealing_rep)
+            field_mapping = self._map_individual_fields(data, dealing_rep, date_str)
         elif form_type == "corporate":
-            field_mapping = self._map_corporate_fields(data, dealing_rep)
+            field_mapping = self._map_corporate_fields(data, dealing_rep, date_str)
         elif form_type == "trade":
-            field_mapping = self._map_trade_fields(data, dealing_rep)
+            field_mapping = self._map_trade_fields(data, dealing_rep, date_str)
         else:
             field_mapping = {}
 
-        # Fill the PDF
-        output_path = self._fill_pdf(template_path, field_mapping, data, form_type)
+        return template_path, field_mapping, now.strftime("%Y%m%d_%H%M%S")
 
-        return str(output_path)
-
-    def _map_individual_fields(self, data: dict, dealing_rep: str) -> dict:
+    def _map_individual_fields(self, data: dict, dealing_rep: str, date_str: str) -> dict:
         """Map extracted data to Individual KYC form fields"""
 
-        client_name = data.get("client_name", {})
-        address = data.get("address", {})
-        contact = data.get("contact", {})
-        personal = data.get("personal", {})
-        employment = data.get("employment", {})
-        spouse_emp = data.get("spouse_employment", {})
-        financials = data.get("financials", {})
-        profile = data.get("investment_profile", {})
-        exemption = data.get("exemption_status", {})
-
-        # Build full name
-        full_name = " ".join(filter(None, [
-            client_name.get("last", ""),
-            client_name.get("first", ""),
-            client_name.get("middle", "")
-        ]))
-
-        # Build full address
-        full_address = ", ".join(filter(None, [
-            address.get("street", ""),
-            address.get("unit", ""),
-        ]))
+        client_name = data.get("client_name") or {}
+        last = client_name.get("last", "")
+        first = client_name.get("first", "")
+        middle = client_name.get("middle", "")
 
-        return {
+        mapping = {
             # Header
-            "Date": datetime.now().strftime("%Y-%m-%d"),
+            "Date": date_str,
             "Dealing Representative": dealing_rep,
 
             # Section 1 - Client Profile
-            "Full Name": full_name,
-            "Last": client_name.get("last", ""),
-            "First": client_name.get("first", ""),
-            "Middle": client_name.get("middle", ""),
-            "Street Address cannot be a PO Box": address.get("street", ""),
-            "ApartmentUnit": address.get("unit", ""),
-            "City": address.get("city", ""),
-            "Prov": address.get("province", ""),
-            "Postal Code": address.get("postal_code", ""),
-            "Phone day": contact.get("phone", ""),
-            "Cell": contact.get("cell", ""),
-            "Email": contact.get("email", ""),
-            "Date of Birth": personal.get("dob", ""),
+            "Full Name": " ".join(part for part in (last, first, middle) if part),
+            "Last": last,
+            "First": first,
+            "Middle": middle,
             "SIN": "",  # Never auto-fill SIN
-            "Dependents": str(personal.get("dependents", "")),
-            "Primary Occupation": employment.get("occupation", ""),
-            "Employer": employment.get("employer", ""),
-
-            # Section 2 - Investment Knowledge (checkboxes)
-            "Good": profile.get("knowledge_level") == "GOOD",
-            "Average": profile.get("knowledge_level") == "AVERAGE",
-            "Limited": profile.get("knowledge_level") == "LIMITED",
-
-            # Section 3 - Suitability
-            "LOW": profile.get("risk_tolerance") == "LOW",
-            "MODERATE": profile.get("risk_tolerance") == "MODERATE",
-            "HIGH": profile.get("risk_tolerance") == "HIGH",
-
-            "Growth": profile.get("investment_objective") == "GROWTH",
-            "Growth  Income": profile.get("investment_objective") == "GROWTH_AND_INCOME",
-            "Income": profile.get("investment_objective") == "INCOME",
-            "Tax Efficiency": profile.get("investment_objective") == "TAX_EFFICIENCY",
-
-            "13 years": profile.get("time_horizon") == "1-3",
-            "35 years": profile.get("time_horizon") == "3-5",
-            "610 years": profile.get("time_horizon") == "6-10",
-            "10 years": profile.get("time_horizon") == "10+",
-
-            # Section 4 - Financial
-            "Employment Annual Income": str(financials.get("annual_income", "")),
-            "SpousePartner Annual Income": str(financials.get("spouse_income", "")),
-            "Other Income": str(financials.get("other_income", "")),
-            "Total Income": str(financials.get("total_income", "")),
-
-            "Estimated Net Financial Assets": str(financials.get("net_financial_assets", "")),
-            "Estimated NonFinancial Assets": str(financials.get("non_financial_assets", "")),
-            "Estimated Total Assets": str(financials.get("total_assets", "")),
-            "Estimated Liabilities": str(financials.get("liabilities", "")),
-            "Estimated Net Worth": str(financials.get("net_worth", "")),
-
-            # Asset composition (percentages)
-            "Cash  Deposits": str(data.get("asset_composition", {}).get("cash_pct", "")),
-            "Public Equities  Stocks": str(data.get("asset_composition", {}).get("stocks_pct", "")),
-            "Fixed Income  Bonds": str(data.get("asset_composition", {}).get("bonds_pct", "")),
-
-            # Section 5 - AML/PEP
-            "PEP Yes": data.get("aml", {}).get("is_pep", False),
-            "PEP No": not data.get("aml", {}).get("is_pep", True),
-            "HIO Yes": data.get("aml", {}).get("is_hio", False),
-            "HIO No": not data.get("aml", {}).get("is_hio", True),
         }
 
-    def _map_corporate_fields(self, data: dict, dealing_rep: str) -> dict:
+        for field, path, as_text in _INDIVIDUAL_FIELDS:
+            value = _lookup(data, path)
+            mapping[field] = str(value) if as_text else value
+
+        # Checkboxes: tick the box matching each extracted choice
+        mapping.update(_INDIVIDUAL_UNCHECKED)
+        for path, choices in _INDIVIDUAL_CHOICES:
+            value = _lookup(data, path, None)
+            if isinstance(value, str) and value in choices:
+                mapping[choices[value]] = True
+
+        # Section 5 - AML/PEP: tick Yes/No only for an explicit answer;
+        # missing or null leaves both blank for the rep to ask
+        aml = data.get("aml") or {}
+        is_pep = aml.get("is_pep")
+        is_hio = aml.get("is_hio")
+        mapping.update({
+            "PEP Yes": is_pep is True,
+            "PEP No": is_pep is False,
+            "HIO Yes": is_hio is True,
+            "HIO No": is_hio is False,
+        })
+
+        return mapping
+
+    def _map_corporate_fields(self, data: dict, dealing_rep: str, date_str: str) -> dict:
         """Map extracted data to Corporate KYC form fields"""
 
         corp_info = data.get("corporate_info", {})
@@ -179,7 +312,7 @@ class KYCPDFFiller:
         auth_persons = data.get("authorized_persons", [{}])
 
         return {
-            "Date": datetime.now().strftime("%Y-%m-%d"),
+            "Date": date_str,
             "Dealing Representative": dealing_rep,
 
             # Section 1 - Corporate Information
@@ -201,7 +334,7 @@ class KYCPDFFiller:
             "Net Assets of corporation": str(financials.get("net_assets", "")),
         }
 
-    def _map_trade_fields(self, data: dict, dealing_rep: str) -> dict:
+    def _map_trade_fields(self, data: dict, dealing_rep: str, date_str: str) -> dict:
         """Map extracted data to Trade Suitability form fields"""
 
         client_name = data.get("client_name", {})
@@ -211,7 +344,7 @@ class KYCPDFFiller:
         full_name = f"{client_name.get('first', '')} {client_name.get('last', '')}".strip()
 
         return {
-            "Date": datetime.now().strftime("%Y-%m-%d"),
+            "Date": date_str,
             "Dealing Representative": dealing_rep,
             "Client": full_name,
 
@@ -232,7 +365,8 @@ class KYCPDFFiller:
         template_path: Path,
         field_mapping: dict,
         data: dict,
-        form_type: str
+        form_type: str,
+        timestamp: str
     ) -> Path:
         """
         Fill a PDF with the provided field mapping.
@@ -242,39 +376,63 @@ class KYCPDFFiller:
             field_mapping: Dictionary mapping PDF field names to values
             data: Original extracted data (for filename)
             form_type: Type of form
+            timestamp: Filename timestamp (YYYYmmdd_HHMMSS)
 
         Returns:
             Path to filled PDF
         """
         # Read the template
-        reader = PdfReader(str(template_path))
-        writer = PdfWriter()
-
-        # Copy pages and fill fields
-        for page in reader.pages:
-            writer.add_page(page)
-
-        # Get existing form fields
-        if reader.get_fields():
-            # Update fields with our values
+        # Field lookups come from the template cache; no get_fields() walk per fill
+        reader, fields, field_pages = self._get_template(template_path)
+
+        # Clone the whole document in one pass - this also carries over the
+        # /AcroForm dictionary, which per-page copying left behind
+        from pypdf import PdfWriter
+        from pypdf.generic import NameObject
+
+        with self._template_lock:
+            writer = PdfWriter(clone_from=reader)
+
+        # Set once for the document: viewers rebuild field appearances on open
+        writer.set_need_appearances_writer(True)
+
+        # Split our values by the pages their fields are on, so each page
+        # is only matched against its own fields
+        page_values = defaultdict(dict)
+        for field, value in field_mapping.items():
+            if isinstance(value, bool):
+                # Checkboxes take a state name, not True/False
+                value = NameObject(_checkbox_state(fields.get(field), value))
+            for index in field_pages.get(field, ()):
+                page_values[index][field] = value
+
+        # Update fields with our values
+        for index, values in page_values.items():
             writer.update_page_form_field_values(
-                writer.pages[0],
-                field_mapping,
-                auto_regenerate=False
+                writer.pages[index],
+                values,
+                auto_regenerate=None  # Leave /NeedAppearances as set above
             )
 
         # Generate output filename
-        client_name = data.get("client_name", {})
-        name_part = f"{client_name.get('first', 'Unknown')}_{client_name.get('last', 'Client')}"
-        name_part = name_part.replace(" ", "_")
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        client_name = data.get("client_name") or {}
+        first = client_name.get("first", "Unknown")
+        last = client_name.get("last", "Client")
+        name_part = f"{first}_{last}".translate(_FILENAME_TRANS)
 
         output_filename = f"{form_type.upper()}_KYC_{name_part}_{timestamp}.pdf"
         output_path = self.output_dir / output_filename
 
-        # Write the filled PDF
+        # Serialize into a buffer pre-sized to about the output size (template
+        # plus filled values) so pypdf's many small writes never regrow it,
+        # then write the file in one call
+        buffer = io.BytesIO()
+        buffer.seek(template_path.stat().st_size + OUTPUT_SIZE_MARGIN - 1)
+        buffer.write(b"\0")
+        buffer.seek(0)
+        writer.write(buffer)
         with open(output_path, "wb") as output_file:
-            writer.write(output_file)
+            output_file.write(buffer.getbuffer()[:buffer.tell()])
 
         return output_path
 
@@ -297,12 +455,36 @@ class KYCPDFFiller:
         if not template_path.exists():
             return []
 
-        reader = PdfReader(str(template_path))
-        fields = reader.get_fields()
+        _, fields, _ = self._get_template(template_path)
+        return list(fields)
+
+    def _get_template(self, template_path: Path) -> tuple:
+        """
+        Get a parsed template and its form fields, parsing it on first use.
+
+        Cached per resolved path and re-parsed when the file's mtime changes.
+
+        Args:
+            template_path: Path to template PDF
+
+        Returns:
+            Tuple of (PdfReader, fields dict, field name -> page indexes)
+        """
+        key = template_path.resolve()
+        mtime = key.stat().st_mtime_ns
+
+        entry = self._template_cache.get(key)
+        if entry is None or entry[0] != mtime:
+            with self._template_lock:
+                entry = self._template_cache.get(key)
+                if entry is None or entry[0] != mtime:
+                    from pypdf import PdfReader
+
+                    reader = PdfReader(str(key))
+                    entry = (mtime, reader, reader.get_fields() or {}, _field_pages(reader))
+                    self._template_cache[key] = entry
 
-        if fields:
-            return list(fields.keys())
-        return []
+        return entry[1:]
 
 
 # For testing
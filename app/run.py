@@ -1,18 +1,33 @@
 """
 Run the Skyvault KYC API server
+
+Serves with several workers by default; set SKYVAULT_DEV=1 for a single
+auto-reloading worker while developing.
 """
 
+import os
+import sys
+from pathlib import Path
+
 import uvicorn
 
+# Make the app package importable when started as `python run.py` from app/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import DEV_MODE
+
 if __name__ == "__main__":
     print("Starting Skyvault KYC API...")
     print("API docs available at: http://localhost:8000/docs")
     print("Webhook endpoint: POST http://localhost:8000/webhook/transcript")
     print("\nPress Ctrl+C to stop\n")
 
+    # The event loop defaults to uvloop wherever it is installed (not on Windows)
     uvicorn.run(
-        "main:app",
+        "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True  # Auto-reload on code changes
+        http="httptools",
+        reload=DEV_MODE,  # Auto-reload on code changes
+        workers=1 if DEV_MODE else (os.cpu_count() or 2)
     )
@@ -1,14 +1,15 @@
 """
 Test script for the KYC extraction pipeline
-Run this to verify the system works end-to-end
+Run this to verify the system works end-to-end:
+
+    python -m app.test_extraction
 """
 
 import asyncio
-import json
-from extractor import KYCExtractor
-from validator import KYCValidator
-from pdf_filler import KYCPDFFiller
-from emailer import send_kyc_email_test
+import orjson
+
+# Pipeline modules are imported inside the test functions so --help and
+# --quick runs don't load pypdf or Resend
 
 
 # Sample Russian transcript for testing
@@ -75,8 +76,17 @@ No, I'm not a politically exposed person and never held government positions.
 """
 
 
+def _dumps(obj) -> str:
+    """Pretty-print JSON, keeping Cyrillic text readable"""
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2, default=str).decode("utf-8")
+
+
 async def test_full_pipeline(transcript: str, language: str = "auto"):
     """Test the full extraction pipeline"""
+    from app.emailer import send_kyc_email_test
+    from app.extractor import KYCExtractor
+    from app.pdf_filler import KYCPDFFiller
+    from app.validator import KYCValidator
 
     print("=" * 60)
     print("SKYVAULT KYC EXTRACTION TEST")
@@ -94,10 +104,19 @@ async def test_full_pipeline(transcript: str, language: str = "auto"):
         print(f"❌ Extraction failed: {e}")
         return
 
-    # Step 2: Validate
-    print("\n[2/4] Validating extracted data...")
+    # Steps 2-3: Validate and generate the PDF concurrently - both only read the extracted data
+    print("\n[2-3/4] Validating extracted data and generating PDF...")
     validator = KYCValidator()
-    validation = validator.validate(extracted, "individual")
+    filler = KYCPDFFiller()
+
+    validation, pdf_result = await asyncio.gather(
+        asyncio.to_thread(validator.validate, extracted, "individual"),
+        filler.fill_async(extracted, "individual"),
+        return_exceptions=True
+    )
+    if isinstance(validation, Exception):
+        print(f"❌ Validation failed: {validation}")
+        return
 
     print(f"✅ Validation complete")
     print(f"   Exemption Status: {validation.exemption_status}")
@@ -105,70 +124,65 @@ async def test_full_pipeline(transcript: str, language: str = "auto"):
     print(f"   Warnings: {len(validation.warnings)}")
     print(f"   Missing Fields: {len(validation.missing_required)}")
 
-    # Step 3: Generate PDF
-    print("\n[3/4] Generating PDF...")
-    filler = KYCPDFFiller()
-
-    try:
-        pdf_path = filler.fill(extracted, "individual")
-        print(f"✅ PDF generated: {pdf_path}")
-    except FileNotFoundError as e:
+    if isinstance(pdf_result, FileNotFoundError):
         print(f"⚠️ PDF generation skipped (template not found)")
         pdf_path = None
-    except Exception as e:
-        print(f"❌ PDF generation failed: {e}")
+    elif isinstance(pdf_result, Exception):
+        print(f"❌ PDF generation failed: {pdf_result}")
         pdf_path = None
+    else:
+        pdf_path = pdf_result
+        print(f"✅ PDF generated: {pdf_path}")
 
     # Step 4: Generate email preview
     print("\n[4/4] Generating email preview...")
-    email_path = send_kyc_email_test(extracted, validation.to_dict(), pdf_path, "individual")
-    print(f"✅ Email preview saved: {email_path}")
+    email_path = await send_kyc_email_test(extracted, validation.to_dict(), pdf_path, "individual")
+    if email_path:
+        print(f"✅ Email preview saved: {email_path}")
+    else:
+        print("⚠️ Email preview skipped (SAVE_EMAIL_PREVIEW=0)")
 
     # Print summary
     print("\n" + "=" * 60)
     print("EXTRACTION SUMMARY")
     print("=" * 60)
-    print(json.dumps(extracted, indent=2, ensure_ascii=False, default=str))
+    print(_dumps(extracted))
 
     print("\n" + "=" * 60)
     print("VALIDATION SUMMARY")
     print("=" * 60)
-    print(json.dumps(validation.to_dict(), indent=2))
+    print(_dumps(validation.to_dict()))
 
     return extracted, validation
 
 
 def test_quick_extract(transcript: str):
     """Test quick extraction for webhook response"""
+    from app.extractor import KYCExtractor
 
     async def run():
         extractor = KYCExtractor()
         result = await extractor.quick_extract(transcript)
         print("Quick Extract Result:")
-        print(json.dumps(result, indent=2, ensure_ascii=False))
+        print(_dumps(result))
         return result
 
     return asyncio.run(run())
 
 
 if __name__ == "__main__":
-    import sys
-
-    print("Select test:")
-    print("1. Russian transcript (full pipeline)")
-    print("2. English transcript (full pipeline)")
-    print("3. Quick extract test (Russian)")
-    print("4. Quick extract test (English)")
-
-    choice = input("\nEnter choice (1-4): ").strip() or "1"
-
-    if choice == "1":
-        asyncio.run(test_full_pipeline(SAMPLE_TRANSCRIPT_RU, "ru"))
-    elif choice == "2":
-        asyncio.run(test_full_pipeline(SAMPLE_TRANSCRIPT_EN, "en"))
-    elif choice == "3":
-        test_quick_extract(SAMPLE_TRANSCRIPT_RU)
-    elif choice == "4":
-        test_quick_extract(SAMPLE_TRANSCRIPT_EN)
-    else:
-        print("Invalid choice")
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the KYC pipeline against a sample transcript")
+    parser.add_argument("--lang", choices=["ru", "en"], default="ru", help="Sample transcript language")
+    parser.add_argument("--quick", action="store_true", help="Run only the quick (name) extraction")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of runs, e.g. for profiling")
+    args = parser.parse_args()
+
+    transcript = SAMPLE_TRANSCRIPT_RU if args.lang == "ru" else SAMPLE_TRANSCRIPT_EN
+
+    for _ in range(args.repeat):
+        if args.quick:
+            test_quick_extract(transcript)
+        else:
+            asyncio.run(test_full_pipeline(transcript, args.lang))
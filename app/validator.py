@@ -3,8 +3,156 @@ KYC Validation Layer
 Checks extracted data against Canadian securities regulations (NI 45-106)
 """
 
+import datetime
+import sys
+import time
+from array import array
+from functools import cache, lru_cache
+from types import MappingProxyType
 from typing import Optional
 from dataclasses import dataclass, field
+from enum import IntFlag, auto
+
+import orjson
+
+
+# Exemption statuses, indexed by the status code from KYCValidator._exemption_core
+EXEMPTION_STATUSES = ("ACCREDITED", "ELIGIBLE", "NON_ELIGIBLE", "UNKNOWN")
+STATUS_ACCREDITED, STATUS_ELIGIBLE, STATUS_NON_ELIGIBLE, STATUS_UNKNOWN = range(4)
+_STATUS_CODES = {name: code for code, name in enumerate(EXEMPTION_STATUSES)}
+
+# Which accredited investor test a client passed (0 = not accredited)
+REASON_INCOME_SINGLE, REASON_INCOME_JOINT, REASON_NFA, REASON_NET_ASSETS = range(1, 5)
+
+
+class Flag(IntFlag):
+    """Which checks fired for a record, alongside the messages they added"""
+    # Exemption (warnings)
+    ELIGIBLE_LIMIT = auto()
+    MINIMUM_AMOUNT_ONLY = auto()
+    # Suitability
+    RISK_EXCEEDS_CAPACITY = auto()
+    HORIZON_PAST_RETIREMENT = auto()
+    GROWTH_WITH_LOW_RISK = auto()
+    INCOME_WITH_HIGH_RISK = auto()
+    SENIOR_HIGH_RISK = auto()
+    SENIOR_LONG_HORIZON = auto()
+    # AML/FINTRAC
+    PEP = auto()
+    HIO = auto()
+    BORROWED_FUNDS = auto()
+    LARGE_NFA = auto()
+    # Concentration
+    CONCENTRATION_OVER_10 = auto()
+    CONCENTRATION_OVER_25 = auto()
+
+
+# Profile suitability rules keyed by risk tolerance, so most clients match
+# none with one lookup: (profile field, values that trigger, bucket, message, flag).
+# _CAPACITY_RULES run before the retirement check and _OBJECTIVE_RULES after it,
+# keeping the order advisors see the messages in
+_CAPACITY_RULES = {
+    "HIGH": (
+        ("risk_capacity", ("LOW", "NIL"), "suitability_concerns",
+         "Risk tolerance (HIGH) exceeds risk capacity (LOW/NIL) - verify with client",
+         Flag.RISK_EXCEEDS_CAPACITY),
+    ),
+}
+_OBJECTIVE_RULES = {
+    "HIGH": (
+        ("investment_objective", ("INCOME",), "warnings",
+         "Income objective with HIGH risk tolerance - verify client understands",
+         Flag.INCOME_WITH_HIGH_RISK),
+    ),
+    "LOW": (
+        ("investment_objective", ("GROWTH",), "suitability_concerns",
+         "Growth objective may not align with LOW risk tolerance",
+         Flag.GROWTH_WITH_LOW_RISK),
+    ),
+}
+
+
+@cache
+def _compile_path(path: str) -> tuple:
+    """Split a dot path into its keys once per distinct path"""
+    return tuple(path.split("."))
+
+
+def _intern(value):
+    """Intern strings parsed from JSON; pass anything else through"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _walk(data: dict, keys: tuple):
+    """Follow keys into nested dicts; None if a level is missing or not a dict"""
+    value = data
+    for key in keys:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+# Required fields an intake call is least likely to cover. When checking stops
+# at the missing limit these are probed first, so sparse records reach it sooner
+_LIKELY_MISSING = (
+    "investment_profile.time_horizon",
+    "investment_profile.investment_objective",
+    "investment_profile.risk_tolerance",
+    "financials.net_financial_assets",
+    "personal.dob",
+    "contact.email",
+)
+
+
+def _compile_required_check(form_type: str, fields: tuple):
+    """
+    Generate a straight-line checker for one form's required fields.
+
+    Each section dict is fetched once into a local and every path becomes an
+    inline probe, so checking a record costs no loops or helper calls. When
+    `limit` covers every field the checker appends missing dot paths to
+    `missing` in REQUIRED_FIELDS order. Otherwise it probes _LIKELY_MISSING
+    fields first and returns as soon as more than `limit` are missing.
+    """
+    lines = ["def check(data, missing, limit):"]
+    sections = {(): "data"}
+    for _, keys in fields:
+        for depth in range(1, len(keys)):
+            if keys[:depth] not in sections:
+                parent = sections[keys[:depth - 1]]
+                name = f"_s{len(sections)}"
+                lines.append(f"    {name} = {parent}.get({keys[depth - 1]!r})" + (
+                    "" if parent == "data" else f" if isinstance({parent}, dict) else None"
+                ))
+                sections[keys[:depth]] = name
+
+    def probe(path, keys, indent):
+        parent = sections[keys[:-1]]
+        return [
+            f"{indent}v = {parent}.get({keys[-1]!r})" + (
+                "" if parent == "data" else f" if isinstance({parent}, dict) else None"
+            ),
+            f"{indent}if v is None or v == \"\":",
+            f"{indent}    missing.append({path!r})",
+        ]
+
+    # Early exit: likely-missing fields first, the rest in their listed order
+    probe_order = sorted(fields, key=lambda item: (
+        _LIKELY_MISSING.index(item[0]) if item[0] in _LIKELY_MISSING else len(_LIKELY_MISSING)
+    ))
+    lines.append(f"    if limit < {len(fields)}:")
+    for path, keys in probe_order:
+        lines.extend(probe(path, keys, " " * 8))
+        lines.append("            if len(missing) > limit:\n                return")
+    lines.append("        return")
+
+    for path, keys in fields:
+        lines.extend(probe(path, keys, " " * 4))
+
+    namespace = {}
+    exec(compile("\n".join(lines), f"<required:{form_type}>", "exec"), namespace)
+    return namespace["check"]
 
 
 @dataclass
@@ -12,11 +160,13 @@ class ValidationResult:
     """Result of KYC validation"""
     is_valid: bool = True
     exemption_status: str = "UNKNOWN"
+    # A fresh list per result, so checks append to them directly
     red_flags: list = field(default_factory=list)
     warnings: list = field(default_factory=list)
     missing_required: list = field(default_factory=list)
     suitability_concerns: list = field(default_factory=list)
     follow_up_needed: bool = False
+    flags: Flag = Flag(0)
 
     def to_dict(self) -> dict:
         return {
@@ -29,6 +179,60 @@ class ValidationResult:
             "follow_up_needed": self.follow_up_needed
         }
 
+    def to_json(self) -> bytes:
+        """to_dict() serialized with orjson, for handlers that send bytes directly"""
+        return orjson.dumps(self.to_dict())
+
+
+# ValidationResult fields holding message lists
+_MESSAGE_FIELDS = ("red_flags", "warnings", "missing_required", "suitability_concerns")
+
+
+@dataclass
+class ValidationResultBatch:
+    """
+    Results of validate_batch(), stored column-wise with one row per record.
+
+    Flags and exemption codes are byte arrays and the checks that fired are
+    a Flag bitmask per row, so status scans never touch message strings.
+    Message lists are kept only for rows that have messages, keyed by row
+    index.
+    """
+    is_valid: array
+    exemption_status: array  # Codes into EXEMPTION_STATUSES
+    follow_up_needed: array
+    flags: array  # Flag bits
+    red_flags: dict = field(default_factory=dict)
+    warnings: dict = field(default_factory=dict)
+    missing_required: dict = field(default_factory=dict)
+    suitability_concerns: dict = field(default_factory=dict)
+
+    @classmethod
+    def empty(cls, size: int) -> "ValidationResultBatch":
+        return cls(
+            array("b", bytes(size)), array("b", bytes(size)), array("b", bytes(size)),
+            array("L", bytes(size * array("L").itemsize))
+        )
+
+    def __len__(self) -> int:
+        return len(self.is_valid)
+
+    def rows_with(self, flag: Flag) -> list:
+        """Indexes of records where any of the given checks fired"""
+        return [row for row, bits in enumerate(self.flags) if bits & flag]
+
+    def to_dict(self, row: int) -> dict:
+        """Same shape as ValidationResult.to_dict() for one record"""
+        return {
+            "is_valid": bool(self.is_valid[row]),
+            "exemption_status": EXEMPTION_STATUSES[self.exemption_status[row]],
+            "red_flags": self.red_flags.get(row, []),
+            "warnings": self.warnings.get(row, []),
+            "missing_required": self.missing_required.get(row, []),
+            "suitability_concerns": self.suitability_concerns.get(row, []),
+            "follow_up_needed": bool(self.follow_up_needed[row])
+        }
+
 
 class KYCValidator:
     """Validate extracted KYC data for regulatory compliance"""
@@ -75,199 +279,322 @@ class KYCValidator:
     ELIGIBLE_INCOME_JOINT = 125000
     ELIGIBLE_NET_ASSETS = 400000
 
-    def validate(self, data: dict, form_type: str = "individual") -> ValidationResult:
+    # REQUIRED_FIELDS with each path pre-split: {form_type: ((path, keys), ...)}
+    # Read-only: the generated checkers below are built from this snapshot
+    _REQUIRED_FIELDS_COMPILED = MappingProxyType({
+        form_type: tuple((path, _compile_path(path)) for path in paths)
+        for form_type, paths in REQUIRED_FIELDS.items()
+    })
+
+    # One generated checker per form type: {form_type: check(data, missing, limit)}
+    _REQUIRED_CHECKS = MappingProxyType({
+        form_type: _compile_required_check(form_type, fields)
+        for form_type, fields in _REQUIRED_FIELDS_COMPILED.items()
+    })
+
+    # More missing required fields than this makes a record invalid
+    MAX_MISSING_REQUIRED = 3
+
+    def __init__(self, collect_all_missing: bool = True):
+        """
+        Args:
+            collect_all_missing: List every missing required field (the list
+                feeds the advisor's follow-up). Bulk callers that only need
+                is_valid can pass False to stop once a record is invalid
+        """
+        self._missing_limit = sys.maxsize if collect_all_missing else self.MAX_MISSING_REQUIRED
+        # Batches repeat the same financials often; typed so 1 and 1.0 keep their own reason text
+        self._classify_exemption = lru_cache(maxsize=4096, typed=True)(self._classify_exemption)
+        self._refresh_year()
+
+    def _refresh_year(self):
+        """Cache the current year until local midnight"""
+        today = datetime.date.today()
+        self._today_year = today.year
+        self._year_expires = datetime.datetime.combine(
+            today + datetime.timedelta(days=1), datetime.time.min
+        ).timestamp()
+
+    def _current_year(self) -> int:
+        if time.time() >= self._year_expires:
+            self._refresh_year()
+        return self._today_year
+
+    def validate(self, data: dict, form_type: str = "individual",
+                 as_of: Optional[datetime.date] = None) -> ValidationResult:
         """
         Validate extracted KYC data.
 
         Args:
             data: Extracted KYC data dictionary
             form_type: Type of form (individual, corporate, trade)
+            as_of: Date to judge ages and retirement against (default: today)
 
         Returns:
             ValidationResult with all findings
         """
-        result = ValidationResult()
+        year = as_of.year if as_of else self._current_year()
+        return self._checker(form_type, year)(data, ValidationResult())
+
+    def _checker(self, form_type: str, year: int):
+        """
+        Bind every check once for records of one form type judged in one year.
 
-        # Check required fields
-        self._check_required_fields(data, form_type, result)
+        Returns:
+            run(data, result) that records one record's findings in result
+        """
+        check_required_fields = self._check_required_fields
+        determine_exemption = self._determine_exemption
+        check_suitability = self._check_suitability
+        check_aml_flags = self._check_aml_flags
+        check_concentration = self._check_concentration
+        max_missing = self.MAX_MISSING_REQUIRED
+
+        def run(data: dict, result: ValidationResult) -> ValidationResult:
+            # Check required fields
+            check_required_fields(data, form_type, result)
+            # Too sparse to assess suitability; the record goes back for follow-up anyway
+            incomplete = len(result.missing_required) > max_missing
+
+            # Determine exemption status
+            determine_exemption(data, result)
+
+            # Check suitability
+            if not incomplete:
+                check_suitability(data, result, year)
+
+            # Check for AML red flags, even on incomplete records
+            check_aml_flags(data, result)
+
+            # Check concentration limits
+            if not incomplete:
+                check_concentration(data, result)
+
+            # Determine if follow-up is needed
+            result.follow_up_needed = (
+                incomplete or
+                len(result.red_flags) > 0 or
+                len(result.suitability_concerns) > 0
+            )
 
-        # Determine exemption status
-        self._determine_exemption(data, result)
+            result.is_valid = not incomplete and len(result.red_flags) == 0
 
-        # Check suitability
-        self._check_suitability(data, result)
+            return result
 
-        # Check for AML red flags
-        self._check_aml_flags(data, result)
+        return run
 
-        # Check concentration limits
-        self._check_concentration(data, result)
+    def validate_batch(self, records: list, form_type: str = "individual",
+                       as_of: Optional[datetime.date] = None) -> ValidationResultBatch:
+        """
+        Validate many KYC records of one form type.
 
-        # Determine if follow-up is needed
-        result.follow_up_needed = (
-            len(result.red_flags) > 0 or
-            len(result.missing_required) > 3 or
-            len(result.suitability_concerns) > 0
-        )
+        The date is read once for the whole batch, so every record is judged
+        against the same day. One scratch result is reused across records and
+        only non-empty message lists are kept.
 
-        result.is_valid = len(result.red_flags) == 0 and len(result.missing_required) <= 3
+        Args:
+            records: Extracted KYC data dictionaries
+            form_type: Type of form (individual, corporate, trade)
+            as_of: Date to judge ages and retirement against (default: today)
 
-        return result
+        Returns:
+            ValidationResultBatch with one row per record, in order
+        """
+        year = (as_of or datetime.date.today()).year
+        batch = ValidationResultBatch.empty(len(records))
+        scratch = ValidationResult()
+        run = self._checker(form_type, year)
+
+        for row, data in enumerate(records):
+            run(data, scratch)
+
+            batch.is_valid[row] = scratch.is_valid
+            batch.exemption_status[row] = _STATUS_CODES[scratch.exemption_status]
+            batch.follow_up_needed[row] = scratch.follow_up_needed
+            batch.flags[row] = scratch.flags
+            scratch.flags = Flag(0)
+            for name in _MESSAGE_FIELDS:
+                messages = getattr(scratch, name)
+                if messages:
+                    getattr(batch, name)[row] = messages
+                    setattr(scratch, name, [])
+
+        return batch
 
     def _get_nested(self, data: dict, path: str):
         """Get nested dictionary value by dot path"""
-        keys = path.split(".")
-        value = data
-        for key in keys:
-            if isinstance(value, dict):
-                value = value.get(key)
-            else:
-                return None
-        return value
+        return _walk(data, _compile_path(path))
 
     def _check_required_fields(self, data: dict, form_type: str, result: ValidationResult):
-        """Check that required fields are present"""
-        required = self.REQUIRED_FIELDS.get(form_type, [])
+        """Check that required fields are present, stopping early once the record is invalid"""
+        check = self._REQUIRED_CHECKS.get(form_type)
+        if check is not None:
+            check(data, result.missing_required, self._missing_limit)
 
-        for field_path in required:
-            value = self._get_nested(data, field_path)
-            if value is None or value == "":
-                result.missing_required.append(field_path)
-
-    def _determine_exemption(self, data: dict, result: ValidationResult):
-        """Determine investor exemption status based on financials"""
-        financials = data.get("financials", {})
+    def _exemption_core(self, annual_income, spouse_income, nfa, net_worth, income_stable) -> tuple:
+        """
+        Classify an investor from their financials alone.
 
-        annual_income = financials.get("annual_income") or 0
-        spouse_income = financials.get("spouse_income") or 0
+        Returns:
+            (status, reason): status is an index into EXEMPTION_STATUSES;
+            reason is which accredited test passed (REASON_*), 0 if none
+        """
         total_income = annual_income + spouse_income
-        nfa = financials.get("net_financial_assets") or 0
-        net_worth = financials.get("net_worth") or 0
-        income_stable = financials.get("income_stable_2_years", False)
-
-        # Check Accredited Investor status
-        is_accredited = False
-        accreditation_reason = None
 
+        # Accredited Investor
         if annual_income >= self.ACCREDITED_INCOME_SINGLE and income_stable:
-            is_accredited = True
+            return STATUS_ACCREDITED, REASON_INCOME_SINGLE
+        if total_income >= self.ACCREDITED_INCOME_JOINT and income_stable:
+            return STATUS_ACCREDITED, REASON_INCOME_JOINT
+        if nfa >= self.ACCREDITED_NFA:
+            return STATUS_ACCREDITED, REASON_NFA
+        if net_worth >= self.ACCREDITED_NET_ASSETS:
+            return STATUS_ACCREDITED, REASON_NET_ASSETS
+
+        # Eligible Investor
+        if (annual_income >= self.ELIGIBLE_INCOME_SINGLE or
+                total_income >= self.ELIGIBLE_INCOME_JOINT or
+                net_worth >= self.ELIGIBLE_NET_ASSETS):
+            return STATUS_ELIGIBLE, 0
+
+        return STATUS_NON_ELIGIBLE, 0
+
+    def _classify_exemption(self, annual_income, spouse_income, nfa, net_worth, income_stable) -> tuple:
+        """
+        Classify an investor and word the accreditation reason.
+
+        Memoized per validator in __init__, so arguments must be hashable.
+
+        Returns:
+            (status, accreditation_reason): reason is None unless accredited
+        """
+        status, reason = self._exemption_core(annual_income, spouse_income, nfa, net_worth, income_stable)
+
+        # Only accredited clients need the reason spelled out
+        accreditation_reason = None
+        if reason == REASON_INCOME_SINGLE:
             accreditation_reason = f"Annual income ${annual_income:,} >= $200,000 for 2 years"
-        elif total_income >= self.ACCREDITED_INCOME_JOINT and income_stable:
-            is_accredited = True
-            accreditation_reason = f"Joint income ${total_income:,} >= $300,000 for 2 years"
-        elif nfa >= self.ACCREDITED_NFA:
-            is_accredited = True
+        elif reason == REASON_INCOME_JOINT:
+            accreditation_reason = f"Joint income ${annual_income + spouse_income:,} >= $300,000 for 2 years"
+        elif reason == REASON_NFA:
             accreditation_reason = f"Net financial assets ${nfa:,} >= $1,000,000"
-        elif net_worth >= self.ACCREDITED_NET_ASSETS:
-            is_accredited = True
+        elif reason == REASON_NET_ASSETS:
             accreditation_reason = f"Net assets ${net_worth:,} >= $5,000,000"
+        return status, accreditation_reason
 
-        # Check Eligible Investor status
-        is_eligible = False
-        if not is_accredited:
-            if annual_income >= self.ELIGIBLE_INCOME_SINGLE:
-                is_eligible = True
-            elif total_income >= self.ELIGIBLE_INCOME_JOINT:
-                is_eligible = True
-            elif net_worth >= self.ELIGIBLE_NET_ASSETS:
-                is_eligible = True
+    def _determine_exemption(self, data: dict, result: ValidationResult):
+        """Determine investor exemption status based on financials"""
+        get = data.get("financials", {}).get
+
+        status, accreditation_reason = self._classify_exemption(
+            get("annual_income") or 0,
+            get("spouse_income") or 0,
+            get("net_financial_assets") or 0,
+            get("net_worth") or 0,
+            bool(get("income_stable_2_years", False))
+        )
 
         # Set exemption status
-        if is_accredited:
-            result.exemption_status = "ACCREDITED"
-        elif is_eligible:
-            result.exemption_status = "ELIGIBLE"
+        result.exemption_status = EXEMPTION_STATUSES[status]
+        if status == STATUS_ELIGIBLE:
             result.warnings.append("Eligible investors have $100k rolling 12-month limit (non-BC)")
-        else:
-            result.exemption_status = "NON_ELIGIBLE"
+            result.flags |= Flag.ELIGIBLE_LIMIT
+        elif status == STATUS_NON_ELIGIBLE:
             result.warnings.append("Client may only invest up to $10,000 under minimum amount exemption")
+            result.flags |= Flag.MINIMUM_AMOUNT_ONLY
 
         # Store in data for reference
-        if "exemption_status" not in data:
-            data["exemption_status"] = {}
-        data["exemption_status"]["is_accredited"] = is_accredited
-        data["exemption_status"]["is_eligible"] = is_eligible
-        data["exemption_status"]["accreditation_reason"] = accreditation_reason
+        exemption = data.setdefault("exemption_status", {})
+        exemption["is_accredited"] = status == STATUS_ACCREDITED
+        exemption["is_eligible"] = status == STATUS_ELIGIBLE
+        exemption["accreditation_reason"] = accreditation_reason
 
-    def _check_suitability(self, data: dict, result: ValidationResult):
+    def _check_suitability(self, data: dict, result: ValidationResult, current_year: Optional[int] = None):
         """Check investment suitability based on profile"""
         profile = data.get("investment_profile", {})
         financials = data.get("financials", {})
         personal = data.get("personal", {})
 
-        risk_tolerance = profile.get("risk_tolerance")
-        risk_capacity = profile.get("risk_capacity")
-        time_horizon = profile.get("time_horizon")
-        objective = profile.get("investment_objective")
+        # Interned values compare against the literals below by identity
+        risk_tolerance = _intern(profile.get("risk_tolerance"))
+        time_horizon = _intern(profile.get("time_horizon"))
+        if current_year is None:
+            current_year = self._current_year()
+        known_tolerance = isinstance(risk_tolerance, str)
 
         # Check risk tolerance vs capacity mismatch
-        if risk_tolerance == "HIGH" and risk_capacity in ["LOW", "NIL"]:
-            result.suitability_concerns.append(
-                "Risk tolerance (HIGH) exceeds risk capacity (LOW/NIL) - verify with client"
-            )
+        rules = _CAPACITY_RULES.get(risk_tolerance, ()) if known_tolerance else ()
+        for field_name, values, bucket, message, flag in rules:
+            if profile.get(field_name) in values:
+                getattr(result, bucket).append(message)
+                result.flags |= flag
 
         # Check time horizon vs retirement
         retirement_year = profile.get("planned_retirement_year")
         if retirement_year:
-            import datetime
-            years_to_retirement = retirement_year - datetime.datetime.now().year
+            years_to_retirement = retirement_year - current_year
             if time_horizon == "10+" and years_to_retirement < 5:
                 result.suitability_concerns.append(
                     f"Time horizon mismatch: selected 10+ years but retirement in {years_to_retirement} years"
                 )
+                result.flags |= Flag.HORIZON_PAST_RETIREMENT
 
         # Check objective vs risk tolerance alignment
-        if objective == "GROWTH" and risk_tolerance == "LOW":
-            result.suitability_concerns.append(
-                "Growth objective may not align with LOW risk tolerance"
-            )
-
-        if objective == "INCOME" and risk_tolerance == "HIGH":
-            result.warnings.append(
-                "Income objective with HIGH risk tolerance - verify client understands"
-            )
+        rules = _OBJECTIVE_RULES.get(risk_tolerance, ()) if known_tolerance else ()
+        for field_name, values, bucket, message, flag in rules:
+            if profile.get(field_name) in values:
+                getattr(result, bucket).append(message)
+                result.flags |= flag
 
         # Check age-based concerns
         dob = personal.get("dob")
         if dob:
             try:
-                import datetime
-                birth_year = int(dob.split("-")[0])
-                age = datetime.datetime.now().year - birth_year
+                birth_year = int(dob[:4])  # YYYY-MM-DD
+                age = current_year - birth_year
                 if age >= 65 and risk_tolerance == "HIGH":
                     result.suitability_concerns.append(
                         f"Client is {age} years old with HIGH risk tolerance - ensure this is appropriate"
                     )
+                    result.flags |= Flag.SENIOR_HIGH_RISK
                 if age >= 70 and time_horizon == "10+":
                     result.suitability_concerns.append(
                         f"Client is {age} years old with 10+ year time horizon - verify suitability"
                     )
-            except (ValueError, IndexError):
+                    result.flags |= Flag.SENIOR_LONG_HORIZON
+            except (TypeError, ValueError):  # Not a YYYY-MM-DD string
                 pass
 
     def _check_aml_flags(self, data: dict, result: ValidationResult):
         """Check for AML/FINTRAC red flags"""
-        aml = data.get("aml", {})
+        aml = data.get("aml")
         financials = data.get("financials", {})
 
-        # PEP check
-        if aml.get("is_pep"):
-            result.red_flags.append(
-                f"Client is a Politically Exposed Person: {aml.get('pep_position', 'position unknown')}"
-            )
-
-        # HIO check
-        if aml.get("is_hio"):
-            result.red_flags.append("Client is Head of International Organization - enhanced due diligence required")
+        # Most clients have no AML answers to check
+        if aml:
+            # PEP check
+            if aml.get("is_pep"):
+                position = aml.get("pep_position") or "position unknown"
+                result.red_flags.append(f"Client is a Politically Exposed Person: {position}")
+                result.flags |= Flag.PEP
+
+            # HIO check
+            if aml.get("is_hio"):
+                result.red_flags.append(
+                    "Client is Head of International Organization - enhanced due diligence required"
+                )
+                result.flags |= Flag.HIO
 
         # Borrowed funds check
         if financials.get("borrowed_to_invest"):
             result.warnings.append("Client using borrowed funds - leverage disclosure required")
+            result.flags |= Flag.BORROWED_FUNDS
 
         # Large NFA verification
         nfa = financials.get("net_financial_assets") or 0
         if nfa >= 1000000:
             result.warnings.append(f"NFA of ${nfa:,} requires verification documentation")
+            result.flags |= Flag.LARGE_NFA
 
     def _check_concentration(self, data: dict, result: ValidationResult):
         """Check investment concentration limits"""
@@ -277,18 +604,20 @@ class KYCValidator:
         nfa = financials.get("net_financial_assets") or 0
         investment_amount = investment.get("amount") or 0
 
-        if nfa > 0 and investment_amount > 0:
+        # Compare exactly in the inputs' own units; the percentage is only
+        # worked out when there is a message to put it in
+        if nfa > 0 and investment_amount > 0 and investment_amount * 10 > nfa:  # >10%
             concentration_pct = (investment_amount / nfa) * 100
+            result.warnings.append(
+                f"Investment represents {concentration_pct:.1f}% of NFA (>10%) - document suitability justification"
+            )
+            result.flags |= Flag.CONCENTRATION_OVER_10
 
-            if concentration_pct > 10:
-                result.warnings.append(
-                    f"Investment represents {concentration_pct:.1f}% of NFA (>10%) - document suitability justification"
-                )
-
-            if concentration_pct > 25:
+            if investment_amount * 4 > nfa:  # >25%
                 result.suitability_concerns.append(
                     f"High concentration: {concentration_pct:.1f}% of NFA in single investment"
                 )
+                result.flags |= Flag.CONCENTRATION_OVER_25
 
 
 # For testing
@@ -3,19 +3,22 @@
 Test runner script for Skyvault KYC project.
 
 Usage:
-    python scripts/run_tests.py             # Run all tests
+    python scripts/run_tests.py             # Run all tests, integration included
     python scripts/run_tests.py unit        # Run only unit tests
     python scripts/run_tests.py integration # Run only integration tests
     python scripts/run_tests.py coverage    # Run tests with coverage report
+    python scripts/run_tests.py fast        # Run tests in parallel, stop on first failure
+
+A bare `pytest` skips integration tests; pass --run-integration to include them.
 """
 
+import importlib.util
 import subprocess
 import sys
 from pathlib import Path
 
-# Ensure we're in the project root
+# Tests always run from the project root
 PROJECT_ROOT = Path(__file__).parent.parent
-sys.path.insert(0, str(PROJECT_ROOT / "app"))
 
 
 def run_command(cmd: list[str]) -> int:
@@ -33,7 +36,7 @@ def main():
     if not args or args[0] == "all":
         # Run all tests
         return run_command([
-            "python", "-m", "pytest", "tests/", "-v", "--tb=short"
+            "python", "-m", "pytest", "tests/", "-v", "--tb=short", "--run-integration"
         ])
 
     elif args[0] == "unit":
@@ -55,14 +58,19 @@ def main():
             "--cov=app",
             "--cov-report=term-missing",
             "--cov-report=html:coverage_html",
+            "--run-integration",
             "-v"
         ])
 
     elif args[0] == "fast":
         # Run tests in parallel (requires pytest-xdist)
-        return run_command([
-            "python", "-m", "pytest", "tests/", "-v", "-x", "--tb=short"
-        ])
+        cmd = ["python", "-m", "pytest", "tests/", "-v", "-x", "--tb=short"]
+        if importlib.util.find_spec("xdist"):
+            # loadfile keeps each test module, and its fixtures, on one worker
+            cmd += ["-n", "auto", "--dist", "loadfile"]
+        else:
+            print("pytest-xdist is not installed; running tests serially")
+        return run_command(cmd)
 
     elif args[0] == "watch":
         # Watch mode (requires pytest-watch)
@@ -2,22 +2,98 @@
 Pytest configuration and shared fixtures for Project Skyvault tests.
 """
 
-import sys
-from pathlib import Path
+import os
+from unittest.mock import AsyncMock
 
+import httpx
 import pytest
+import pytest_asyncio
+from _pytest.mark.expression import Expression
+from pytest_asyncio import is_async_test
 
-# Add app directory to path for imports
-app_dir = Path(__file__).parent.parent / "app"
-sys.path.insert(0, str(app_dir))
 
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-integration", action="store_true",
+        help="also run tests marked integration (skipped by default unless -m selects integration)"
+    )
+
+
+def _selected_for_integration(markexpr: str, item) -> bool:
+    """Whether a -m expression picks this test because of its integration mark"""
+    names = {mark.name for mark in item.iter_markers()}
+    expression = Expression.compile(markexpr)
+    return expression.evaluate(names.__contains__) and not expression.evaluate((names - {"integration"}).__contains__)
+
+
+def pytest_collection_modifyitems(config, items):
+    """Run async tests on one session-wide event loop; skip integration tests unless asked for."""
+    session_loop = pytest.mark.asyncio(scope="session")
+    skip_integration = None
+    if not config.getoption("--run-integration"):
+        skip_integration = pytest.mark.skip(reason="integration test: pass --run-integration")
+    markexpr = config.getoption("markexpr")
+
+    for item in items:
+        if is_async_test(item):
+            item.add_marker(session_loop, append=False)
+        if (skip_integration and "integration" in item.keywords
+                and not (markexpr and _selected_for_integration(markexpr, item))):
+            item.add_marker(skip_integration)
+
+
+# --- API Fixtures ---
+
+@pytest.fixture(scope="session", autouse=True)
+def _test_env():
+    """Set a dummy Anthropic key once; tests never depend on it being absent."""
+    os.environ["ANTHROPIC_API_KEY"] = "test-key"
+    yield
+
+
+@pytest_asyncio.fixture(scope="session")
+async def client():
+    """Async client calling the FastAPI app in-process, built once per session."""
+    # Imported here so `pytest --collect-only` and unit-only runs skip the app's imports
+    from app import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+_QUICK_EXTRACT_JOHN_DOE = {"first_name": "John", "last_name": "Doe", "missing_fields": []}
+_QUICK_MOCK = AsyncMock(return_value=_QUICK_EXTRACT_JOHN_DOE)
 
-# --- Sample Data Fixtures ---
 
 @pytest.fixture
-def sample_individual_data():
-    """Complete individual KYC extracted data for testing."""
-    return {
+def mock_quick(client, monkeypatch):
+    """Replace the app's quick_extract for one test; answers "John Doe" by default.
+
+    One AsyncMock is reused across tests and reset afterwards, so tests may
+    set return_value or side_effect freely.
+    """
+    from app import main
+    monkeypatch.setattr(main.extractor, "quick_extract", _QUICK_MOCK)
+    yield _QUICK_MOCK
+    _QUICK_MOCK.reset_mock(return_value=True, side_effect=True)
+    _QUICK_MOCK.return_value = _QUICK_EXTRACT_JOHN_DOE
+
+
+@pytest.fixture(scope="session")
+def extractor():
+    """The app's own KYCExtractor, shared for the session; tests patch its client per test."""
+    from app import main
+    return main.extractor
+
+
+# --- Sample Data Fixtures ---
+# Session-scoped fixtures are built once and shared by every test: treat them
+# as read-only. The derived investor fixtures are built fresh for each test.
+
+def _individual_data(**sections):
+    """Build a fresh individual KYC record, replacing the given top-level sections."""
+    data = {
         "client_type": "individual",
         "personal_info": {
             "first_name": "Ivan",
@@ -72,13 +148,20 @@ def sample_individual_data():
             "issuing_jurisdiction": "Canada"
         }
     }
+    data.update(sections)
+    return data
+
+
+@pytest.fixture(scope="session")
+def sample_individual_data():
+    """Complete individual KYC extracted data for testing."""
+    return _individual_data()
 
 
 @pytest.fixture
-def sample_accredited_investor_data(sample_individual_data):
+def sample_accredited_investor_data():
     """Individual data that qualifies as Accredited Investor."""
-    data = sample_individual_data.copy()
-    data["financial_info"] = {
+    return _individual_data(financial_info={
         "annual_income": 250000,
         "joint_income": None,
         "net_financial_assets": 1500000,
@@ -86,15 +169,13 @@ def sample_accredited_investor_data(sample_individual_data):
         "liquid_assets": 1000000,
         "fixed_assets": 5000000,
         "liabilities": 500000
-    }
-    return data
+    })
 
 
 @pytest.fixture
-def sample_eligible_investor_data(sample_individual_data):
+def sample_eligible_investor_data():
     """Individual data that qualifies as Eligible Investor."""
-    data = sample_individual_data.copy()
-    data["financial_info"] = {
+    return _individual_data(financial_info={
         "annual_income": 100000,
         "joint_income": None,
         "net_financial_assets": 600000,
@@ -102,15 +183,13 @@ def sample_eligible_investor_data(sample_individual_data):
         "liquid_assets": 400000,
         "fixed_assets": 100000,
         "liabilities": 50000
-    }
-    return data
+    })
 
 
 @pytest.fixture
-def sample_non_eligible_data(sample_individual_data):
+def sample_non_eligible_data():
     """Individual data that does NOT qualify for exemptions."""
-    data = sample_individual_data.copy()
-    data["financial_info"] = {
+    return _individual_data(financial_info={
         "annual_income": 50000,
         "joint_income": None,
         "net_financial_assets": 50000,
@@ -118,25 +197,22 @@ def sample_non_eligible_data(sample_individual_data):
         "liquid_assets": 30000,
         "fixed_assets": 70000,
         "liabilities": 20000
-    }
-    return data
+    })
 
 
 @pytest.fixture
-def sample_pep_data(sample_individual_data):
+def sample_pep_data():
     """Individual data flagged as PEP."""
-    data = sample_individual_data.copy()
-    data["compliance"] = {
+    return _individual_data(compliance={
         "is_pep": True,
         "is_hio": False,
         "is_insider": False,
         "borrowed_funds": False,
         "third_party_account": False
-    }
-    return data
+    })
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_corporate_data():
     """Complete corporate KYC extracted data for testing."""
     return {
@@ -188,7 +264,7 @@ def sample_corporate_data():
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_transcript_russian():
     """Sample Russian KYC call transcript."""
     return """
@@ -203,7 +279,7 @@ def sample_transcript_russian():
     """
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_transcript_english():
     """Sample English KYC call transcript."""
     return """
@@ -220,7 +296,7 @@ def sample_transcript_english():
 
 # --- Mock Fixtures ---
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_anthropic_response():
     """Mock successful Claude API response."""
     return {
@@ -12,22 +12,15 @@ import json
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from fastapi.testclient import TestClient
 
 
 class TestHealthCheck:
     """Tests for the health check endpoint."""
 
-    @pytest.fixture
-    def client(self):
-        with patch.dict("os.environ", {"ANTHROPIC_API_KEY": "test-key"}):
-            from app.main import app
-            return TestClient(app)
-
     @pytest.mark.integration
-    def test_health_check_returns_healthy(self, client):
+    async def test_health_check_returns_healthy(self, client):
         """Test that health check returns healthy status."""
-        response = client.get("/")
+        response = await client.get("/")
 
         assert response.status_code == 200
         data = response.json()
@@ -38,17 +31,11 @@ class TestHealthCheck:
 class TestWebhookEndpoint:
     """Tests for the /webhook/transcript endpoint."""
 
-    @pytest.fixture
-    def client(self):
-        with patch.dict("os.environ", {"ANTHROPIC_API_KEY": "test-key"}):
-            from app.main import app
-            return TestClient(app)
-
     @pytest.fixture
     def valid_transcript_request(self):
         """Valid transcript request fixture."""
         return {
-            "transcript": "Hello, my name is John Doe. I am 45 years old and work as an engineer. My annual income is $150,000.",
+            "transcript": "Client: Hello, my name is John Doe. I am 45 years old and work as an engineer. My annual income is $150,000.",
             "source_language": "en",
             "client_id": "test-123",
             "dealing_rep": "Test Rep",
@@ -56,93 +43,85 @@ class TestWebhookEndpoint:
             "form_type": "individual"
         }
 
+    @pytest.fixture
+    def unnamed_transcript_request(self, valid_transcript_request):
+        """Transcript where the client never introduces themselves."""
+        return {
+            **valid_transcript_request,
+            "transcript": "Advisor: Thanks for joining. Client: I am 45 years old and work as an engineer."
+        }
+
     @pytest.mark.integration
-    def test_webhook_accepts_valid_transcript(self, client, valid_transcript_request):
+    async def test_webhook_accepts_valid_transcript(self, client, mock_quick, valid_transcript_request):
         """Test webhook accepts valid transcript and returns processing status."""
-        with patch("app.main.extractor.quick_extract", new_callable=AsyncMock) as mock_extract:
-            mock_extract.return_value = {
-                "first_name": "John",
-                "last_name": "Doe",
-                "missing_fields": []
-            }
-
-            response = client.post("/webhook/transcript", json=valid_transcript_request)
+        response = await client.post("/webhook/transcript", json=valid_transcript_request)
 
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "processing"
         assert data["client_name"] == "John Doe"
         assert data["form_type"] == "individual"
+        mock_quick.assert_not_called()  # Name found locally, no Claude call
 
     @pytest.mark.integration
-    def test_webhook_rejects_short_transcript(self, client):
-        """Test webhook rejects transcripts that are too short."""
-        response = client.post("/webhook/transcript", json={
-            "transcript": "Too short"
-        })
+    async def test_webhook_falls_back_to_quick_extract(self, client, mock_quick, unnamed_transcript_request):
+        """Test webhook asks Claude for the name when no introduction is found."""
+        response = await client.post("/webhook/transcript", json=unnamed_transcript_request)
 
-        assert response.status_code == 400
-        assert "too short" in response.json()["detail"].lower()
+        assert response.status_code == 200
+        assert response.json()["client_name"] == "John Doe"
+        mock_quick.assert_awaited_once()
 
     @pytest.mark.integration
-    def test_webhook_rejects_empty_transcript(self, client):
-        """Test webhook rejects empty transcripts."""
-        response = client.post("/webhook/transcript", json={
-            "transcript": ""
+    @pytest.mark.parametrize("transcript, detail", [
+        ("Too short", "too short"),
+        ("", None),
+        ("   \n\t   ", None),  # Whitespace only
+    ])
+    async def test_webhook_rejects_invalid_transcript(self, client, transcript, detail):
+        """Test webhook rejects short, empty and whitespace-only transcripts."""
+        response = await client.post("/webhook/transcript", json={
+            "transcript": transcript
         })
 
         assert response.status_code == 400
+        if detail:
+            assert detail in response.json()["detail"].lower()
 
     @pytest.mark.integration
-    def test_webhook_rejects_whitespace_only_transcript(self, client):
-        """Test webhook rejects whitespace-only transcripts."""
-        response = client.post("/webhook/transcript", json={
-            "transcript": "   \n\t   "
-        })
-
-        assert response.status_code == 400
+    async def test_webhook_uses_default_values(self, client, mock_quick):
+        """Test webhook accepts a transcript-only request and defaults the optional fields."""
+        mock_quick.return_value = {"first_name": "Test", "last_name": "User", "missing_fields": []}
 
-    @pytest.mark.integration
-    def test_webhook_uses_default_values(self, client):
-        """Test webhook uses default values for optional fields."""
-        with patch("app.main.extractor.quick_extract", new_callable=AsyncMock) as mock_extract:
-            mock_extract.return_value = {
-                "first_name": "Test",
-                "last_name": "User",
-                "missing_fields": []
-            }
-
-            response = client.post("/webhook/transcript", json={
-                "transcript": "A sufficiently long transcript to pass validation checks for the endpoint."
-            })
+        response = await client.post("/webhook/transcript", json={
+            "transcript": "A sufficiently long transcript to pass validation checks for the endpoint."
+        })
 
         assert response.status_code == 200
         data = response.json()
         assert data["form_type"] == "individual"  # Default
 
     @pytest.mark.integration
-    def test_webhook_handles_extraction_failure(self, client, valid_transcript_request):
+    async def test_webhook_handles_extraction_failure(self, client, mock_quick, unnamed_transcript_request):
         """Test webhook handles extraction failure gracefully."""
-        with patch("app.main.extractor.quick_extract", new_callable=AsyncMock) as mock_extract:
-            mock_extract.side_effect = Exception("API Error")
+        mock_quick.side_effect = Exception("API Error")
 
-            response = client.post("/webhook/transcript", json=valid_transcript_request)
+        response = await client.post("/webhook/transcript", json=unnamed_transcript_request)
 
         assert response.status_code == 200
         data = response.json()
         assert data["client_name"] is None or data["client_name"] == "Unknown"
 
     @pytest.mark.integration
-    def test_webhook_returns_missing_fields(self, client, valid_transcript_request):
+    async def test_webhook_returns_missing_fields(self, client, mock_quick, unnamed_transcript_request):
         """Test webhook returns missing fields from quick extraction."""
-        with patch("app.main.extractor.quick_extract", new_callable=AsyncMock) as mock_extract:
-            mock_extract.return_value = {
-                "first_name": "John",
-                "last_name": None,
-                "missing_fields": ["last_name", "email"]
-            }
+        mock_quick.return_value = {
+            "first_name": "John",
+            "last_name": None,
+            "missing_fields": ["last_name", "email"]
+        }
 
-            response = client.post("/webhook/transcript", json=valid_transcript_request)
+        response = await client.post("/webhook/transcript", json=unnamed_transcript_request)
 
         assert response.status_code == 200
         data = response.json()
@@ -152,12 +131,6 @@ class TestWebhookEndpoint:
 class TestSyncExtractEndpoint:
     """Tests for the /extract/sync endpoint."""
 
-    @pytest.fixture
-    def client(self):
-        with patch.dict("os.environ", {"ANTHROPIC_API_KEY": "test-key"}):
-            from app.main import app
-            return TestClient(app)
-
     @pytest.fixture
     def valid_transcript_request(self):
         return {
@@ -167,7 +140,7 @@ class TestSyncExtractEndpoint:
         }
 
     @pytest.mark.integration
-    def test_sync_extract_returns_full_data(self, client, valid_transcript_request):
+    async def test_sync_extract_returns_full_data(self, client, valid_transcript_request):
         """Test sync extraction returns full extracted data."""
         mock_extracted = {
             "client_name": {"first": "Jane", "last": "Smith"},
@@ -178,7 +151,7 @@ class TestSyncExtractEndpoint:
         with patch("app.main.extractor.extract", new_callable=AsyncMock) as mock_extract:
             mock_extract.return_value = mock_extracted
 
-            response = client.post("/extract/sync", json=valid_transcript_request)
+            response = await client.post("/extract/sync", json=valid_transcript_request)
 
         assert response.status_code == 200
         data = response.json()
@@ -187,7 +160,7 @@ class TestSyncExtractEndpoint:
         assert data["extracted_data"]["financials"]["annual_income"] == 200000
 
     @pytest.mark.integration
-    def test_sync_extract_includes_validation(self, client, valid_transcript_request):
+    async def test_sync_extract_includes_validation(self, client, valid_transcript_request):
         """Test sync extraction includes validation results."""
         mock_extracted = {
             "client_name": {"first": "Jane", "last": "Smith"},
@@ -197,14 +170,54 @@ class TestSyncExtractEndpoint:
         with patch("app.main.extractor.extract", new_callable=AsyncMock) as mock_extract:
             mock_extract.return_value = mock_extracted
 
-            response = client.post("/extract/sync", json=valid_transcript_request)
+            response = await client.post("/extract/sync", json=valid_transcript_request)
 
         assert response.status_code == 200
         data = response.json()
         assert "validation" in data
 
     @pytest.mark.integration
-    def test_sync_extract_supports_corporate_form(self, client):
+    async def test_sync_extract_validation_keys(self, client, valid_transcript_request):
+        """Test the validation payload keeps its documented fields and nothing else."""
+        with patch("app.main.extractor.extract", new_callable=AsyncMock) as mock_extract:
+            mock_extract.return_value = {"client_name": {"first": "Jane", "last": "Smith"}}
+
+            response = await client.post("/extract/sync", json=valid_transcript_request)
+
+        assert set(response.json()["validation"]) == {
+            "is_valid", "exemption_status", "red_flags", "warnings",
+            "missing_required", "suitability_concerns", "follow_up_needed",
+        }
+
+    @pytest.mark.integration
+    async def test_sync_extract_large_response_is_gzipped(self, client, valid_transcript_request):
+        """Test large extraction responses are gzip-compressed."""
+        mock_extracted = {
+            "client_name": {"first": "Jane", "last": "Smith"},
+            "notes": "x" * 4096
+        }
+
+        with patch("app.main.extractor.extract", new_callable=AsyncMock) as mock_extract:
+            mock_extract.return_value = mock_extracted
+
+            response = await client.post(
+                "/extract/sync",
+                json=valid_transcript_request,
+                headers={"Accept-Encoding": "gzip"}
+            )
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json()["extracted_data"]["notes"] == "x" * 4096
+
+    @pytest.mark.integration
+    async def test_small_response_is_not_gzipped(self, client):
+        """Test responses under the minimum size are sent uncompressed."""
+        response = await client.get("/", headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in response.headers
+
+    @pytest.mark.integration
+    async def test_sync_extract_supports_corporate_form(self, client):
         """Test sync extraction works with corporate form type."""
         mock_extracted = {
             "corporate_name": "Test Corp Inc",
@@ -214,7 +227,7 @@ class TestSyncExtractEndpoint:
         with patch("app.main.extractor.extract", new_callable=AsyncMock) as mock_extract:
             mock_extract.return_value = mock_extracted
 
-            response = client.post("/extract/sync", json={
+            response = await client.post("/extract/sync", json={
                 "transcript": "This is a corporate KYC call for Test Corp Inc, business number 123456789.",
                 "form_type": "corporate"
             })
@@ -227,25 +240,19 @@ class TestSyncExtractEndpoint:
 class TestRequestValidation:
     """Tests for request validation."""
 
-    @pytest.fixture
-    def client(self):
-        with patch.dict("os.environ", {"ANTHROPIC_API_KEY": "test-key"}):
-            from app.main import app
-            return TestClient(app)
-
     @pytest.mark.integration
-    def test_missing_transcript_field(self, client):
+    async def test_missing_transcript_field(self, client):
         """Test request without transcript field is rejected."""
-        response = client.post("/webhook/transcript", json={
+        response = await client.post("/webhook/transcript", json={
             "source_language": "en"
         })
 
         assert response.status_code == 422  # Validation error
 
     @pytest.mark.integration
-    def test_invalid_json_body(self, client):
+    async def test_invalid_json_body(self, client):
         """Test invalid JSON body is rejected."""
-        response = client.post(
+        response = await client.post(
             "/webhook/transcript",
             content="not valid json",
             headers={"Content-Type": "application/json"}
@@ -253,40 +260,55 @@ class TestRequestValidation:
 
         assert response.status_code == 422
 
-    @pytest.mark.integration
-    def test_accepts_minimal_request(self, client):
-        """Test accepts request with only required fields."""
-        with patch("app.main.extractor.quick_extract", new_callable=AsyncMock) as mock_extract:
-            mock_extract.return_value = {"first_name": "Test", "last_name": "User", "missing_fields": []}
-
-            response = client.post("/webhook/transcript", json={
-                "transcript": "This is a minimal request with just the transcript field that meets minimum length."
-            })
-
-        assert response.status_code == 200
-
 
 class TestBackgroundProcessing:
     """Tests for background task processing."""
 
-    @pytest.fixture
-    def client(self):
-        with patch.dict("os.environ", {"ANTHROPIC_API_KEY": "test-key"}):
-            from app.main import app
-            return TestClient(app)
-
     @pytest.mark.integration
-    def test_background_task_is_queued(self, client):
+    @pytest.mark.usefixtures("mock_quick")
+    async def test_background_task_is_queued(self, client, monkeypatch):
         """Test that background processing task is queued."""
-        with patch("app.main.extractor.quick_extract", new_callable=AsyncMock) as mock_quick:
-            mock_quick.return_value = {"first_name": "John", "last_name": "Doe", "missing_fields": []}
+        queued = []
+        # Background tasks run before the response returns, so record them instead
+        monkeypatch.setattr("app.main.BackgroundTasks.add_task", lambda _self, func, *_args, **_kwargs: queued.append(func))
 
-            with patch("app.main.BackgroundTasks.add_task") as mock_add_task:
-                # Note: TestClient runs background tasks synchronously by default
-                response = client.post("/webhook/transcript", json={
-                    "transcript": "A long enough transcript to process for background task testing purposes."
-                })
+        response = await client.post("/webhook/transcript", json={
+            "transcript": "A long enough transcript to process for background task testing purposes."
+        })
 
         assert response.status_code == 200
         # Response returns immediately with "processing" status
         assert response.json()["status"] == "processing"
+        assert queued
+
+    @pytest.mark.integration
+    async def test_background_pipeline_emails_validation_and_pdf(self):
+        """Test the background task validates, fills the PDF and emails both results."""
+        from app import main
+
+        extracted = {
+            "client_name": {"first": "Jane", "last": "Smith"},
+            "financials": {"annual_income": 250000, "income_stable_2_years": True}
+        }
+
+        with patch.object(main.extractor, "extract", new_callable=AsyncMock) as mock_extract, \
+                patch.object(main.pdf_filler, "fill", return_value="/tmp/KYC.pdf") as mock_fill, \
+                patch("app.main.send_kyc_email", new_callable=AsyncMock) as mock_email:
+            mock_extract.return_value = extracted
+
+            await main.process_kyc_background(
+                transcript="transcript",
+                source_language="en",
+                form_type="individual",
+                dealing_rep="Test Rep",
+                client_id="test-123"
+            )
+
+        fill_kwargs = mock_fill.call_args.kwargs
+        assert (fill_kwargs["form_type"], fill_kwargs["dealing_rep"]) == ("individual", "Test Rep")
+        # The filler gets a snapshot, untouched by what the validator writes into the data
+        assert fill_kwargs["data"] is not extracted
+        assert fill_kwargs["data"] == {key: value for key, value in extracted.items() if key != "exemption_status"}
+        email_kwargs = mock_email.call_args.kwargs
+        assert email_kwargs["pdf_path"] == "/tmp/KYC.pdf"
+        assert email_kwargs["validation_result"]["exemption_status"] == "ACCREDITED"
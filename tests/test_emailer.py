@@ -0,0 +1,247 @@
+"""
+Unit tests for the email notification module.
+
+Tests cover:
+- PDF attachment encoding
+- HTML email rendering
+- Sending via Resend
+- Send rate limiting
+- Batch coalescing
+- Email preview output
+"""
+
+import asyncio
+import base64
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.emailer import (
+    B64_CHUNK_SIZE,
+    TokenBucket,
+    _build_email_html,
+    _EmailQueue,
+    _encode_attachment,
+    _fmt_currency,
+    send_kyc_email,
+    send_kyc_email_test,
+)
+
+
+class TestAttachmentEncoding:
+    """Tests for chunked base64 attachment encoding."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("size", [0, 1, 2, 3, B64_CHUNK_SIZE - 1, B64_CHUNK_SIZE, B64_CHUNK_SIZE * 3 + 2])
+    def test_matches_stdlib_encoding(self, tmp_path, size):
+        """Test chunked encoding is identical to encoding the whole file at once."""
+        payload = bytes(i % 251 for i in range(size))
+        pdf_path = tmp_path / "form.pdf"
+        pdf_path.write_bytes(payload)
+
+        assert _encode_attachment(pdf_path) == base64.b64encode(payload).decode()
+
+
+class TestCurrencyFormat:
+    """Tests for dollar amount formatting."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("value, expected", [
+        (None, "N/A"),
+        (0, "$0"),
+        (1500000, "$1,500,000"),
+        (180000.9, "$180,000"),
+        ("250000", "$250,000"),
+        ("about 500k", "about 500k"),
+    ])
+    def test_formats_amounts(self, value, expected):
+        """Test ints, floats and numeric strings are formatted; other text passes through."""
+        assert _fmt_currency(value) == expected
+
+
+class TestEmailHtml:
+    """Tests for the HTML email body."""
+
+    @pytest.mark.unit
+    def test_renders_client_and_financials(self):
+        """Test client details and formatted currency appear in the body."""
+        data = {
+            "client_name": {"first": "Ivan", "last": "Petrenko"},
+            "financials": {"annual_income": 180000, "net_worth": None},
+        }
+        html = _build_email_html(data, {"exemption_status": "ACCREDITED"}, "individual")
+
+        assert "Ivan Petrenko" in html
+        assert "$180,000" in html
+        assert "INDIVIDUAL KYC" in html
+        assert "#28a745" in html  # Accredited badge colour
+
+    @pytest.mark.unit
+    def test_sections_only_rendered_when_present(self):
+        """Test optional sections are omitted when there is nothing to report."""
+        html = _build_email_html({}, {}, "individual")
+
+        assert "Red Flags" not in html
+        assert "Missing Fields" not in html
+        assert "Unknown" in html
+
+    @pytest.mark.unit
+    def test_escapes_transcript_values(self):
+        """Test values taken from the transcript cannot inject markup."""
+        data = {"client_name": {"first": "<script>", "last": "X"}}
+        html = _build_email_html(data, {"red_flags": ["<b>PEP</b>"]}, "individual")
+
+        assert "<script>" not in html
+        assert "&lt;b&gt;PEP&lt;/b&gt;" in html
+
+
+class TestSendEmail:
+    """Tests for send_kyc_email()."""
+
+    @pytest.fixture
+    def extracted(self):
+        return {"client_name": {"first": "Ivan", "last": "Petrenko"}}
+
+    @pytest.mark.unit
+    async def test_sends_with_subject_and_recipients(self, extracted):
+        """Test the Resend payload carries sender, recipient and subject."""
+        with patch("app.emailer.resend.Emails.send") as mock_send:
+            sent = await send_kyc_email(extracted, {"red_flags": []})
+
+        assert sent is True
+        params = mock_send.call_args.args[0]
+        assert params["subject"] == "✅ KYC Extraction Complete: Ivan Petrenko"
+        assert params["to"] and params["from"]
+        assert "attachments" not in params
+
+    @pytest.mark.unit
+    async def test_flags_in_subject(self, extracted):
+        """Test red flags switch the subject indicator."""
+        with patch("app.emailer.resend.Emails.send") as mock_send:
+            await send_kyc_email(extracted, {"red_flags": ["PEP"]})
+
+        assert mock_send.call_args.args[0]["subject"].startswith("⚠️ ")
+
+    @pytest.mark.unit
+    async def test_attaches_pdf(self, extracted, tmp_path):
+        """Test an existing PDF is attached base64-encoded."""
+        pdf_path = tmp_path / "KYC.pdf"
+        pdf_path.write_bytes(b"%PDF-1.7 test")
+
+        with patch("app.emailer.resend.Emails.send") as mock_send:
+            await send_kyc_email(extracted, {}, pdf_path=str(pdf_path))
+
+        attachment = mock_send.call_args.args[0]["attachments"][0]
+        assert attachment["filename"] == "KYC.pdf"
+        assert base64.b64decode(attachment["content"]) == b"%PDF-1.7 test"
+
+    @pytest.mark.unit
+    async def test_returns_false_on_send_failure(self, extracted):
+        """Test a Resend error is reported rather than raised."""
+        with patch("app.emailer.resend.Emails.send", side_effect=Exception("429")):
+            assert await send_kyc_email(extracted, {}) is False
+
+
+class TestTokenBucket:
+    """Tests for the Resend send rate limiter."""
+
+    @pytest.mark.unit
+    async def test_burst_up_to_capacity_is_immediate(self):
+        """Test acquisitions within capacity do not wait."""
+        bucket = TokenBucket(rate=1, capacity=3)
+        start = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+
+        assert time.monotonic() - start < 0.05
+
+    @pytest.mark.unit
+    async def test_waits_for_refill_when_empty(self):
+        """Test an empty bucket waits roughly one refill interval."""
+        bucket = TokenBucket(rate=50, capacity=1)
+        await bucket.acquire()
+        start = time.monotonic()
+        async with bucket:
+            pass
+
+        assert time.monotonic() - start >= 0.015
+
+    @pytest.mark.unit
+    async def test_rate_below_one_still_releases_tokens(self):
+        """Test a sub-1/s rate holds at least one token instead of blocking forever."""
+        bucket = TokenBucket(rate=0.5)
+
+        await asyncio.wait_for(bucket.acquire(), timeout=0.1)
+        assert bucket.capacity == 1.0
+
+
+class TestEmailQueue:
+    """Tests for coalescing attachment-free sends into batch calls."""
+
+    @pytest.mark.unit
+    async def test_concurrent_sends_share_one_batch(self):
+        """Test emails queued within the window go out in a single batch call."""
+        queue = _EmailQueue(window=0.01)
+        with patch("app.emailer.resend.Batch.send") as mock_batch, \
+                patch("app.emailer.resend.Emails.send") as mock_send:
+            await asyncio.gather(*(queue.send({"subject": str(i)}) for i in range(3)))
+
+        mock_batch.assert_called_once_with([{"subject": "0"}, {"subject": "1"}, {"subject": "2"}])
+        mock_send.assert_not_called()
+
+    @pytest.mark.unit
+    async def test_full_batch_flushes_immediately(self):
+        """Test reaching max_batch sends without waiting for the window."""
+        queue = _EmailQueue(window=60, max_batch=2)
+        with patch("app.emailer.resend.Batch.send") as mock_batch:
+            await asyncio.wait_for(asyncio.gather(queue.send({}), queue.send({})), timeout=1)
+
+        mock_batch.assert_called_once()
+
+    @pytest.mark.unit
+    async def test_batch_failure_raises_for_every_sender(self):
+        """Test a failed batch call is reported to all waiting senders."""
+        queue = _EmailQueue(window=0.01)
+        with patch("app.emailer.resend.Batch.send", side_effect=Exception("429")):
+            results = await asyncio.gather(queue.send({}), queue.send({}), return_exceptions=True)
+
+        assert all(isinstance(r, Exception) for r in results)
+
+    @pytest.mark.unit
+    async def test_attachments_bypass_batch(self, tmp_path):
+        """Test emails with a PDF are sent individually (batch sends can't carry attachments)."""
+        pdf_path = tmp_path / "KYC.pdf"
+        pdf_path.write_bytes(b"%PDF-1.7 test")
+
+        with patch("app.emailer.resend.Batch.send") as mock_batch, \
+                patch("app.emailer.resend.Emails.send") as mock_send:
+            await send_kyc_email({}, {}, pdf_path=str(pdf_path))
+
+        mock_send.assert_called_once()
+        mock_batch.assert_not_called()
+
+
+class TestEmailPreview:
+    """Tests for send_kyc_email_test()."""
+
+    @pytest.mark.unit
+    async def test_writes_preview_html(self, tmp_path, monkeypatch):
+        """Test the rendered email is written to the preview path."""
+        preview = tmp_path / "email_preview.html"
+        monkeypatch.setattr("app.emailer.EMAIL_PREVIEW_PATH", preview)
+
+        path = await send_kyc_email_test({"client_name": {"first": "Ivan", "last": "P"}}, {})
+
+        assert path == str(preview)
+        assert "Ivan P" in preview.read_text(encoding="utf-8")
+
+    @pytest.mark.unit
+    async def test_skipped_when_disabled(self, tmp_path, monkeypatch):
+        """Test nothing is written when previews are disabled."""
+        preview = tmp_path / "email_preview.html"
+        monkeypatch.setattr("app.emailer.EMAIL_PREVIEW_PATH", preview)
+        monkeypatch.setattr("app.emailer.SAVE_EMAIL_PREVIEW", False)
+
+        assert await send_kyc_email_test({}, {}) is None
+        assert not preview.exists()
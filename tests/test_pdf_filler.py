@@ -0,0 +1,302 @@
+"""
+Unit tests for KYC PDF Filler module.
+
+Tests cover:
+- Template parsing and caching
+- Form field listing
+- Field mapping
+- Filling and writing output PDFs
+"""
+
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import (
+    ArrayObject,
+    BooleanObject,
+    DictionaryObject,
+    FloatObject,
+    NameObject,
+    TextStringObject,
+)
+
+from app.pdf_filler import KYCPDFFiller
+
+# Generated templates draw fields with these names as checkboxes rather than text fields
+_CHECKBOX_FIELDS = {"MODERATE", "HIGH"}
+
+
+def _write_form_pdf(path, *page_fields):
+    """Write a PDF with one page per list of names, each name a field on that page."""
+    writer = PdfWriter()
+    fields = ArrayObject()
+    for names in page_fields:
+        page = writer.add_blank_page(width=612, height=792)
+        annots = ArrayObject()
+        for i, name in enumerate(names):
+            top = 750 - i * 30
+            field = DictionaryObject({
+                NameObject("/Type"): NameObject("/Annot"),
+                NameObject("/Subtype"): NameObject("/Widget"),
+                NameObject("/FT"): NameObject("/Tx"),
+                NameObject("/T"): TextStringObject(name),
+                NameObject("/V"): TextStringObject(""),
+                NameObject("/Rect"): ArrayObject([FloatObject(50), FloatObject(top - 20), FloatObject(300), FloatObject(top)]),
+            })
+            if name in _CHECKBOX_FIELDS:
+                field.update({
+                    NameObject("/FT"): NameObject("/Btn"),
+                    NameObject("/V"): NameObject("/Off"),
+                    NameObject("/AS"): NameObject("/Off"),
+                    NameObject("/AP"): DictionaryObject({NameObject("/N"): DictionaryObject({
+                        NameObject("/On"): writer._add_object(DictionaryObject()),
+                        NameObject("/Off"): writer._add_object(DictionaryObject()),
+                    })}),
+                })
+            ref = writer._add_object(field)
+            fields.append(ref)
+            annots.append(ref)
+        page[NameObject("/Annots")] = annots
+
+    writer._root_object[NameObject("/AcroForm")] = DictionaryObject({NameObject("/Fields"): fields})
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+@pytest.fixture
+def filler(tmp_path):
+    """Filler whose individual template is a small generated form."""
+    _write_form_pdf(tmp_path / "individual.pdf", ["Full Name", "City", "Email"])
+    filler = KYCPDFFiller(templates_dir=str(tmp_path))
+    filler.templates = {"individual": "individual.pdf"}
+    filler.output_dir = tmp_path / "output"
+    filler.output_dir.mkdir()
+    yield filler
+    KYCPDFFiller._template_cache.clear()
+
+
+class TestTemplateCache:
+    """Tests for parsed template caching."""
+
+    @pytest.mark.unit
+    def test_template_parsed_once(self, filler, tmp_path):
+        """Test repeated lookups reuse the same parsed reader."""
+        template_path = tmp_path / "individual.pdf"
+        reader, fields, _ = filler._get_template(template_path)
+
+        assert filler._get_template(template_path)[0] is reader
+        assert set(fields) == {"Full Name", "City", "Email"}
+
+    @pytest.mark.unit
+    def test_cache_shared_between_fillers(self, filler, tmp_path):
+        """Test a second filler instance reuses the parsed template."""
+        template_path = tmp_path / "individual.pdf"
+        reader, _, _ = filler._get_template(template_path)
+
+        assert KYCPDFFiller(templates_dir=str(tmp_path))._get_template(template_path)[0] is reader
+
+    @pytest.mark.unit
+    def test_fields_walked_once(self, filler):
+        """Test listing fields and filling share one get_fields() traversal."""
+        with patch.object(PdfReader, "get_fields", autospec=True, side_effect=PdfReader.get_fields) as mock_get_fields:
+            filler.list_form_fields("individual")
+            filler.fill({}, "individual")
+            filler.list_form_fields("individual")
+
+        assert mock_get_fields.call_count == 1
+
+    @pytest.mark.unit
+    def test_modified_template_is_reparsed(self, filler, tmp_path):
+        """Test a template edited on disk is parsed again."""
+        template_path = tmp_path / "individual.pdf"
+        reader, _, _ = filler._get_template(template_path)
+
+        _write_form_pdf(template_path, ["Full Name", "Postal Code"])
+        stat = template_path.stat()
+        os.utime(template_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        new_reader, fields, _ = filler._get_template(template_path)
+        assert new_reader is not reader
+        assert set(fields) == {"Full Name", "Postal Code"}
+
+
+class TestListFormFields:
+    """Tests for list_form_fields()."""
+
+    @pytest.mark.unit
+    def test_lists_template_fields(self, filler):
+        """Test field names are read from the template."""
+        assert sorted(filler.list_form_fields("individual")) == ["City", "Email", "Full Name"]
+
+    @pytest.mark.unit
+    def test_unknown_form_type_returns_empty(self, filler):
+        """Test unknown form types have no fields."""
+        assert filler.list_form_fields("mortgage") == []
+
+
+class TestIndividualMapping:
+    """Tests for _map_individual_fields()."""
+
+    @pytest.mark.unit
+    def test_maps_text_and_checkbox_fields(self, filler):
+        """Test values are copied and only the matching checkbox is ticked."""
+        data = {
+            "client_name": {"first": "Ivan", "last": "Petrenko"},
+            "financials": {"annual_income": 180000},
+            "investment_profile": {"risk_tolerance": "MODERATE", "time_horizon": "10+"}
+        }
+
+        mapping = filler._map_individual_fields(data, "Test Rep", "2025-01-15")
+
+        assert mapping["Date"] == "2025-01-15"
+        assert mapping["Dealing Representative"] == "Test Rep"
+        assert mapping["Full Name"] == "Petrenko Ivan"
+        assert mapping["First"] == "Ivan"
+        assert mapping["Employment Annual Income"] == "180000"
+        assert mapping["MODERATE"] is True
+        assert mapping["LOW"] is False and mapping["HIGH"] is False
+        assert mapping["10 years"] is True
+        assert mapping["SIN"] == ""
+
+    @pytest.mark.unit
+    def test_null_sections_map_to_blanks(self, filler):
+        """Test sections the model returned as null do not break the mapping."""
+        mapping = filler._map_individual_fields(
+            {"address": None, "investment_profile": None}, "Test Rep", "2025-01-15"
+        )
+
+        assert mapping["City"] == ""
+        assert mapping["Good"] is False
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("aml, pep_yes, pep_no", [
+        ({"is_pep": True}, True, False),
+        ({"is_pep": False}, False, True),
+        ({"is_pep": None}, False, False),
+        ({}, False, False),
+        (None, False, False),
+    ])
+    def test_pep_boxes_need_explicit_answer(self, filler, aml, pep_yes, pep_no):
+        """Test PEP Yes/No are only ticked for an explicit answer."""
+        mapping = filler._map_individual_fields({"aml": aml}, "Test Rep", "2025-01-15")
+
+        assert mapping["PEP Yes"] is pep_yes
+        assert mapping["PEP No"] is pep_no
+
+
+class TestFill:
+    """Tests for fill()."""
+
+    @pytest.mark.unit
+    def test_fill_writes_values(self, filler):
+        """Test mapped values are written into the output PDF."""
+        data = {
+            "client_name": {"first": "Ivan", "last": "Petrenko"},
+            "address": {"city": "Calgary"},
+            "contact": {"email": "ivan@example.com"}
+        }
+
+        output = filler.fill(data, "individual")
+
+        values = {name: field.get("/V") for name, field in PdfReader(output).get_fields().items()}
+        assert values["Full Name"] == "Petrenko Ivan"
+        assert values["City"] == "Calgary"
+        assert values["Email"] == "ivan@example.com"
+
+    @pytest.mark.unit
+    def test_repeated_fills_are_independent(self, filler):
+        """Test filling from a cached template does not leak values between clients."""
+        filler.fill({"client_name": {"first": "Ivan", "last": "Petrenko"}, "address": {"city": "Calgary"}}, "individual")
+        output = filler.fill({"client_name": {"first": "Anna", "last": "Koval"}}, "individual")
+
+        values = {name: field.get("/V") for name, field in PdfReader(output).get_fields().items()}
+        assert values["Full Name"] == "Koval Anna"
+        assert values["City"] == ""
+
+    @pytest.mark.unit
+    async def test_fill_async_matches_fill(self, filler):
+        """Test the async variant fills the same form off the event loop."""
+        output = await filler.fill_async({"client_name": {"first": "Ivan", "last": "Petrenko"}}, "individual")
+
+        assert PdfReader(output).get_fields()["Full Name"]["/V"] == "Petrenko Ivan"
+
+    @pytest.mark.unit
+    def test_output_asks_viewer_to_regenerate_appearances(self, filler):
+        """Test filled PDFs set /NeedAppearances so viewers redraw field values."""
+        output = filler.fill({"client_name": {"first": "Ivan", "last": "Petrenko"}}, "individual")
+
+        assert PdfReader(output).trailer["/Root"]["/AcroForm"]["/NeedAppearances"] == BooleanObject(True)
+
+    @pytest.mark.unit
+    def test_output_has_no_reserved_padding(self, filler):
+        """Test the pre-sized write buffer's unused tail is not written out."""
+        output = Path(filler.fill({}, "individual"))
+
+        assert output.read_bytes().rstrip().endswith(b"%%EOF")
+
+    @pytest.mark.unit
+    def test_fills_fields_on_later_pages(self, filler, tmp_path):
+        """Test fields beyond the first page are filled too."""
+        _write_form_pdf(tmp_path / "individual.pdf", ["Full Name"], [], ["City", "Email"])
+
+        output = filler.fill({"client_name": {"first": "Ivan", "last": "Petrenko"}, "address": {"city": "Calgary"}}, "individual")
+
+        fields = PdfReader(output).get_fields()
+        assert fields["Full Name"]["/V"] == "Petrenko Ivan"
+        assert fields["City"]["/V"] == "Calgary"
+
+    @pytest.mark.unit
+    def test_checkboxes_use_widget_states(self, filler, tmp_path):
+        """Test ticked and unticked boxes, on any page, are written as the widget's state names."""
+        _write_form_pdf(tmp_path / "individual.pdf", ["Full Name"], ["MODERATE", "HIGH"])
+
+        output = filler.fill({"investment_profile": {"risk_tolerance": "MODERATE"}}, "individual")
+
+        widgets = {annot["/T"]: annot for annot in (ref.get_object() for ref in PdfReader(output).pages[1]["/Annots"])}
+        assert widgets["MODERATE"]["/AS"] == "/On"
+        assert widgets["HIGH"]["/AS"] == "/Off"
+
+    @pytest.mark.slow
+    async def test_fill_async_in_worker_process(self, filler):
+        """Test fills can run in a worker process with the same result."""
+        filler.processes = 1
+        try:
+            output = await filler.fill_async({"client_name": {"first": "Ivan", "last": "Petrenko"}}, "individual")
+        finally:
+            filler._pool.shutdown()
+
+        assert PdfReader(output).get_fields()["Full Name"]["/V"] == "Petrenko Ivan"
+
+    @pytest.mark.unit
+    def test_date_field_matches_filename_timestamp(self, filler):
+        """Test the form Date and the output filename come from one clock read."""
+        with patch.object(filler, "_map_individual_fields", wraps=filler._map_individual_fields) as mock_map:
+            output = filler.fill({"client_name": {"first": "Ivan", "last": "Petrenko"}}, "individual")
+
+        date_str = mock_map.call_args.args[2]
+        assert Path(output).name.startswith(f"INDIVIDUAL_KYC_Ivan_Petrenko_{date_str.replace('-', '')}_")
+
+    @pytest.mark.unit
+    def test_filename_strips_path_characters(self, filler):
+        """Test names with path separators cannot escape the output directory."""
+        output = Path(filler.fill({"client_name": {"first": "Ivan Jr", "last": "../Petrenko"}}, "individual"))
+
+        assert output.parent == filler.output_dir
+        assert output.name.startswith("INDIVIDUAL_KYC_Ivan_Jr_.._Petrenko_")
+
+    @pytest.mark.unit
+    def test_unknown_form_type_raises(self, filler):
+        """Test unknown form types are rejected."""
+        with pytest.raises(ValueError, match="Unknown form type"):
+            filler.fill({}, "mortgage")
+
+    @pytest.mark.unit
+    def test_missing_template_raises(self, filler, tmp_path):
+        """Test a missing template file is reported."""
+        (tmp_path / "individual.pdf").unlink()
+
+        with pytest.raises(FileNotFoundError):
+            filler.fill({}, "individual")
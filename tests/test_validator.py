@@ -9,8 +9,32 @@ Tests cover:
 - Concentration limits
 """
 
+import datetime
+import json
+
 import pytest
-from app.validator import KYCValidator, ValidationResult
+from app.validator import (
+    EXEMPTION_STATUSES,
+    REASON_INCOME_JOINT,
+    REASON_INCOME_SINGLE,
+    REASON_NET_ASSETS,
+    REASON_NFA,
+    STATUS_ACCREDITED,
+    STATUS_ELIGIBLE,
+    STATUS_NON_ELIGIBLE,
+    Flag,
+    KYCValidator,
+    ValidationResult,
+)
+
+# Identity sections that keep a record within MAX_MISSING_REQUIRED once its
+# financials are given, so validate() still runs the suitability checks
+_IDENTITY = {
+    "client_name": {"first": "John", "last": "Doe"},
+    "address": {"city": "Toronto", "province": "ON"},
+    "contact": {"email": "john@example.com"},
+    "employment": {"occupation": "Engineer"},
+}
 
 
 class TestValidationResult:
@@ -27,6 +51,16 @@ class TestValidationResult:
         assert result.missing_required == []
         assert result.suitability_concerns == []
         assert result.follow_up_needed is False
+        assert result.flags == 0
+
+    @pytest.mark.unit
+    def test_message_lists_are_per_result(self):
+        """Test callers can append to a result without touching another's lists."""
+        first, second = ValidationResult(), ValidationResult()
+        first.warnings.append("High NFA")
+
+        assert first.warnings == ["High NFA"]
+        assert second.warnings == []
 
     @pytest.mark.unit
     def test_to_dict(self):
@@ -50,6 +84,13 @@ class TestValidationResult:
         assert d["suitability_concerns"] == ["Age mismatch"]
         assert d["follow_up_needed"] is True
 
+    @pytest.mark.unit
+    def test_to_json_matches_to_dict(self):
+        """Test the JSON bytes decode to the same dict, empty lists included."""
+        result = ValidationResult(exemption_status="ELIGIBLE", warnings=["High NFA"])
+
+        assert json.loads(result.to_json()) == result.to_dict()
+
 
 class TestGetNested:
     """Tests for _get_nested helper method."""
@@ -95,6 +136,27 @@ class TestGetNested:
         """Test access on empty dictionary."""
         assert validator._get_nested({}, "any.key") is None
 
+    @pytest.mark.unit
+    def test_non_dict_level_returns_none(self, validator):
+        """Test that walking through a non-dict value returns None."""
+        data = {"client_name": "John Doe", "address": None}
+        assert validator._get_nested(data, "client_name.first") is None
+        assert validator._get_nested(data, "address.city") is None
+
+    @pytest.mark.unit
+    def test_required_paths_are_precompiled(self):
+        """Test every required field path is split once at class load."""
+        for form_type, paths in KYCValidator.REQUIRED_FIELDS.items():
+            compiled = KYCValidator._REQUIRED_FIELDS_COMPILED[form_type]
+            assert [path for path, _ in compiled] == paths
+            assert all(keys == tuple(path.split(".")) for path, keys in compiled)
+
+    @pytest.mark.unit
+    def test_compiled_required_paths_are_read_only(self):
+        """Test the compiled table cannot drift from the generated checkers."""
+        with pytest.raises(TypeError):
+            KYCValidator._REQUIRED_FIELDS_COMPILED["individual"] = ()
+
 
 class TestExemptionDetermination:
     """Tests for investor exemption status determination."""
@@ -269,6 +331,30 @@ class TestExemptionDetermination:
 
         assert result.exemption_status == "NON_ELIGIBLE"
 
+    @pytest.mark.unit
+    @pytest.mark.parametrize("financials, expected", [
+        ((200000, 0, 0, 0, True), (STATUS_ACCREDITED, REASON_INCOME_SINGLE)),
+        ((200000, 100000, 0, 0, True), (STATUS_ACCREDITED, REASON_INCOME_SINGLE)),
+        ((150000, 150000, 0, 0, True), (STATUS_ACCREDITED, REASON_INCOME_JOINT)),
+        ((0, 0, 1000000, 0, False), (STATUS_ACCREDITED, REASON_NFA)),
+        ((0, 0, 0, 5000000, False), (STATUS_ACCREDITED, REASON_NET_ASSETS)),
+        ((250000, 0, 0, 0, False), (STATUS_ELIGIBLE, 0)),
+        ((0, 0, 0, 0, False), (STATUS_NON_ELIGIBLE, 0)),
+    ])
+    def test_exemption_core_codes(self, validator, financials, expected):
+        """Test the numeric core returns the status and the first accredited test passed."""
+        assert validator._exemption_core(*financials) == expected
+
+    @pytest.mark.unit
+    def test_repeated_financials_reuse_classification(self, validator):
+        """Test identical financials are classified once, keeping int and float wording apart."""
+        for income in (250000, 250000, 250000.0):
+            data = {"financials": {"annual_income": income, "income_stable_2_years": True}}
+            validator._determine_exemption(data, ValidationResult())
+
+        assert validator._classify_exemption.cache_info().hits == 1
+        assert data["exemption_status"]["accreditation_reason"] == "Annual income $250,000.0 >= $200,000 for 2 years"
+
 
 class TestAMLFlags:
     """Tests for AML/FINTRAC red flag detection."""
@@ -292,6 +378,7 @@ class TestAMLFlags:
         assert len(result.red_flags) == 1
         assert "Politically Exposed Person" in result.red_flags[0]
         assert "Member of Parliament" in result.red_flags[0]
+        assert result.flags == Flag.PEP
 
     @pytest.mark.unit
     def test_pep_without_position(self, validator):
@@ -303,6 +390,18 @@ class TestAMLFlags:
         assert len(result.red_flags) == 1
         assert "position unknown" in result.red_flags[0]
 
+    @pytest.mark.unit
+    @pytest.mark.parametrize("aml", [None, {}, {"is_pep": True, "pep_position": None}])
+    def test_empty_or_null_aml_answers(self, validator, aml):
+        """Test a null AML section is skipped and a null position reads as unknown."""
+        result = ValidationResult()
+        validator._check_aml_flags({"aml": aml}, result)
+
+        if aml:
+            assert result.red_flags == ["Client is a Politically Exposed Person: position unknown"]
+        else:
+            assert result.red_flags == []
+
     @pytest.mark.unit
     def test_hio_detection(self, validator):
         """Test HIO (Head of International Organization) detection."""
@@ -413,6 +512,25 @@ class TestConcentration:
 
         assert len(result.warnings) == 0
 
+    @pytest.mark.unit
+    @pytest.mark.parametrize("amount, warned, concerned", [
+        (10000, False, False),  # Exactly 10%
+        (10001, True, False),
+        (25000, True, False),   # Exactly 25%
+        (25001, True, True),
+    ])
+    def test_thresholds_are_strict(self, validator, amount, warned, concerned):
+        """Test exactly 10% and 25% of NFA do not cross the limits."""
+        data = {
+            "financials": {"net_financial_assets": 100000},
+            "investment_details": {"amount": amount}
+        }
+        result = ValidationResult()
+        validator._check_concentration(data, result)
+
+        assert bool(result.warnings) is warned
+        assert bool(result.suitability_concerns) is concerned
+
 
 class TestSuitability:
     """Tests for investment suitability checks."""
@@ -421,6 +539,28 @@ class TestSuitability:
     def validator(self):
         return KYCValidator()
 
+    @pytest.mark.unit
+    @pytest.mark.parametrize("tolerance, capacity, objective, expected", [
+        ("HIGH", "LOW", "BALANCED", ["Risk tolerance (HIGH) exceeds", "Time horizon mismatch"]),
+        ("LOW", "HIGH", "GROWTH", ["Time horizon mismatch", "Growth objective"]),
+    ])
+    def test_concerns_keep_check_order(self, validator, tolerance, capacity, objective, expected):
+        """Test concerns come out as capacity, then retirement horizon, then objective."""
+        data = {
+            "investment_profile": {
+                "risk_tolerance": tolerance,
+                "risk_capacity": capacity,
+                "investment_objective": objective,
+                "time_horizon": "10+",
+                "planned_retirement_year": 2027
+            }
+        }
+        result = ValidationResult()
+        validator._check_suitability(data, result, 2025)
+
+        assert len(result.suitability_concerns) == len(expected)
+        assert all(c.startswith(p) for c, p in zip(result.suitability_concerns, expected, strict=True))
+
     @pytest.mark.unit
     def test_risk_tolerance_capacity_mismatch(self, validator):
         """Test detection of risk tolerance vs capacity mismatch."""
@@ -504,16 +644,57 @@ class TestSuitability:
         assert not any("years old" in c for c in result.suitability_concerns)
 
     @pytest.mark.unit
-    def test_invalid_dob_format(self, validator):
-        """Test handling of invalid DOB format."""
+    @pytest.mark.parametrize("dob", ["invalid-date", 1950])
+    def test_invalid_dob_format(self, validator, dob):
+        """Test handling of invalid DOB format, including a bare number."""
         data = {
-            "personal": {"dob": "invalid-date"},
+            "personal": {"dob": dob},
             "investment_profile": {"risk_tolerance": "HIGH"}
         }
         result = ValidationResult()
         # Should not raise exception
         validator._check_suitability(data, result)
 
+    @pytest.mark.unit
+    def test_profile_strings_match_when_not_literal_objects(self, validator):
+        """Test profile values built at runtime still match the rule literals."""
+        data = {
+            "investment_profile": {
+                "investment_objective": "".join(["GRO", "WTH"]),
+                "risk_tolerance": "".join(["LO", "W"])
+            }
+        }
+        result = ValidationResult()
+        validator._check_suitability(data, result)
+
+        assert any("Growth objective" in c for c in result.suitability_concerns)
+
+    @pytest.mark.unit
+    def test_age_judged_as_of_given_date(self, validator):
+        """Test validate(as_of=...) overrides today for the age checks."""
+        data = {
+            **_IDENTITY,
+            "financials": {"annual_income": 50000, "net_financial_assets": 100000},
+            "personal": {"dob": "1960-01-15"},
+            "investment_profile": {"risk_tolerance": "HIGH"}
+        }
+
+        before = validator.validate(data, as_of=datetime.date(2020, 6, 1))
+        after = validator.validate(data, as_of=datetime.date(2026, 6, 1))
+
+        assert not any("years old" in c for c in before.suitability_concerns)
+        assert any("Client is 66 years old" in c for c in after.suitability_concerns)
+
+    @pytest.mark.unit
+    def test_current_year_cached_until_midnight(self, validator):
+        """Test the year is read from the clock once, then refreshed after it expires."""
+        validator._today_year = 1999
+
+        assert validator._current_year() == 1999
+
+        validator._year_expires = 0
+        assert validator._current_year() == datetime.date.today().year
+
 
 class TestRequiredFields:
     """Tests for required field validation."""
@@ -592,6 +773,69 @@ class TestRequiredFields:
         assert "client_name" in result.missing_required
         assert "investment_details.issuer" in result.missing_required
 
+    @pytest.mark.unit
+    def test_default_lists_every_missing_field(self):
+        """Test the default validator reports the full missing list for follow-up."""
+        result = ValidationResult()
+        KYCValidator()._check_required_fields({}, "individual", result)
+
+        assert result.missing_required == KYCValidator.REQUIRED_FIELDS["individual"]
+
+    @pytest.mark.unit
+    def test_stops_once_record_is_invalid(self):
+        """Test a bulk validator stops listing missing fields past the limit."""
+        result = ValidationResult()
+        KYCValidator(collect_all_missing=False)._check_required_fields({}, "individual", result)
+
+        assert result.missing_required == [
+            "investment_profile.time_horizon",
+            "investment_profile.investment_objective",
+            "investment_profile.risk_tolerance",
+            "financials.net_financial_assets",
+        ]
+
+    @pytest.mark.unit
+    def test_sparse_record_is_invalid(self):
+        """Test a record with only contact basics is invalid, with or without the early exit."""
+        data = {
+            "client_name": {"first": "John", "last": "Doe"},
+            "address": {"city": "Toronto", "province": "ON"},
+            "contact": {"email": "john@example.com"}
+        }
+
+        assert KYCValidator().validate(data).is_valid is False
+        assert KYCValidator(collect_all_missing=False).validate(data).is_valid is False
+
+    @pytest.mark.unit
+    def test_early_exit_keeps_validity(self):
+        """Test stopping early gives the same is_valid and follow_up_needed."""
+        data = {"client_name": {"first": "John"}}
+
+        fast = KYCValidator(collect_all_missing=False).validate(data)
+        full = KYCValidator().validate(data)
+
+        assert len(full.missing_required) == 11
+        assert (fast.is_valid, fast.follow_up_needed) == (full.is_valid, full.follow_up_needed)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("form_type", ["individual", "corporate", "trade"])
+    @pytest.mark.parametrize("data", [
+        {},
+        {"client_name": "John Doe", "address": None, "financials": {"annual_income": 0}},
+        {"client_name": {"first": "John", "last": ""}, "investment_details": {"issuer": "X", "amount": 0}},
+        {"corporate_name": "Test Corp", "financials": {"net_assets": "", "annual_income": None}},
+    ])
+    def test_generated_check_matches_dot_path_lookup(self, validator, form_type, data):
+        """Test the generated checker reports exactly the paths _get_nested finds empty."""
+        expected = [
+            path for path in KYCValidator.REQUIRED_FIELDS[form_type]
+            if validator._get_nested(data, path) in (None, "")
+        ]
+        result = ValidationResult()
+        validator._check_required_fields(data, form_type, result)
+
+        assert result.missing_required == expected
+
 
 class TestFullValidation:
     """Integration tests for full validate() method."""
@@ -667,6 +911,23 @@ class TestFullValidation:
         assert result.is_valid is False
         assert len(result.missing_required) > 3
 
+    @pytest.mark.unit
+    def test_incomplete_record_skips_suitability_but_not_aml(self, validator):
+        """Test a record missing too many fields gets AML checks but no suitability or concentration."""
+        data = {
+            "client_name": {"first": "John"},
+            "financials": {"net_financial_assets": 100000},
+            "investment_profile": {"risk_tolerance": "HIGH", "risk_capacity": "LOW"},
+            "investment_details": {"amount": 50000},
+            "aml": {"is_pep": True}
+        }
+        result = validator.validate(data, "individual")
+
+        assert result.is_valid is False
+        assert result.follow_up_needed is True
+        assert result.flags == Flag.PEP | Flag.MINIMUM_AMOUNT_ONLY
+        assert result.suitability_concerns == []
+
     @pytest.mark.unit
     def test_follow_up_needed_for_suitability_concerns(self, validator):
         """Test follow-up needed when suitability concerns exist."""
@@ -693,6 +954,77 @@ class TestFullValidation:
         assert len(result.suitability_concerns) > 0
 
 
+class TestValidateBatch:
+    """Tests for validate_batch()."""
+
+    @pytest.fixture
+    def validator(self):
+        return KYCValidator()
+
+    @pytest.mark.unit
+    def test_batch_matches_single_validation(self, validator):
+        """Test each batch result equals validating the record on its own."""
+        records = [
+            {"financials": {"annual_income": 250000, "income_stable_2_years": True}},
+            {"financials": {"annual_income": 80000}, "aml": {"is_pep": True}},
+            {"personal": {"dob": "1950-01-15"}, "investment_profile": {"time_horizon": "10+"}},
+            {},
+        ]
+        as_of = datetime.date(2025, 6, 1)
+
+        batch = validator.validate_batch(records, "individual", as_of=as_of)
+
+        assert len(batch) == len(records)
+        assert [batch.to_dict(row) for row in range(len(batch))] == [
+            validator.validate(data, "individual", as_of=as_of).to_dict() for data in records
+        ]
+        assert [EXEMPTION_STATUSES[code] for code in batch.exemption_status] == [
+            "ACCREDITED", "ELIGIBLE", "NON_ELIGIBLE", "NON_ELIGIBLE"
+        ]
+
+    @pytest.mark.unit
+    def test_only_rows_with_messages_are_stored(self, validator):
+        """Test message columns skip rows that have no messages."""
+        records = [
+            {
+                "client_name": "John Doe",
+                "investment_details": {"issuer": "Acme", "amount": 10000, "source_of_funds": "Savings"},
+                "financials": {"annual_income": 250000, "income_stable_2_years": True}
+            },
+            {"aml": {"is_pep": True}},
+        ]
+
+        batch = validator.validate_batch(records, "trade")
+
+        assert list(batch.red_flags) == [1]
+        assert list(batch.warnings) == [1]
+        assert list(batch.missing_required) == [1]
+        assert list(batch.is_valid) == [1, 0]
+
+    @pytest.mark.unit
+    def test_flags_column_records_fired_checks(self, validator):
+        """Test each row's flags name the checks that added messages."""
+        records = [
+            {"financials": {"annual_income": 250000, "income_stable_2_years": True}},
+            {**_IDENTITY, "aml": {"is_pep": True}, "personal": {"dob": "1980-01-15"},
+             "financials": {"annual_income": 50000, "net_financial_assets": 100000},
+             "investment_details": {"amount": 30000}},
+        ]
+
+        batch = validator.validate_batch(records)
+
+        assert batch.flags[0] == 0
+        assert batch.flags[1] == (
+            Flag.PEP | Flag.MINIMUM_AMOUNT_ONLY | Flag.CONCENTRATION_OVER_10 | Flag.CONCENTRATION_OVER_25
+        )
+        assert batch.rows_with(Flag.PEP | Flag.HIO) == [1]
+
+    @pytest.mark.unit
+    def test_empty_batch(self, validator):
+        """Test an empty batch has no rows."""
+        assert len(validator.validate_batch([])) == 0
+
+
 class TestEdgeCases:
     """Tests for edge cases and boundary conditions."""
 